@@ -192,10 +192,11 @@ class AILifeOperatingSystem:
         """Setup event handling for proactive intelligence"""
         def handle_periodic_check(event_data):
             try:
-                # Run proactive analysis
-                predictions = self.pattern_engine.predict_user_needs("user")
+                # Run proactive analysis from a single experience retrieval
+                experiences = self.memory_manager.retrieve_experiences("user", 200)
+                predictions = self.pattern_engine.predict_user_needs("user", experiences)
                 if predictions.get('predictions'):
-                    pattern_analysis = self.pattern_engine.analyze_all_patterns("user")
+                    pattern_analysis = self.pattern_engine.analyze_all_patterns("user", experiences=experiences)
                     proactive_plan = self.proactive_engine._generate_proactive_plan(pattern_analysis, predictions)
 
 
@@ -2,13 +2,33 @@
 CORRECTED Memory Manager - Fixed integration, enhanced features, and reliable storage
 """
 
+import copy
 import json
+import threading
 import time
 from typing import Dict, Any, List
 from sqlalchemy import create_engine, text
 from config.settings import settings
+from memory.text_features import extract_message_features
 from sqlalchemy.orm import sessionmaker
 
+# Time-of-day tag for each UTC hour of the day
+_HOUR_BUCKETS = ("time:evening",) * 6 + ("time:morning",) * 6 + ("time:afternoon",) * 6 + ("time:evening",) * 6
+
+# (epoch hour, tag) of the last computed temporal tag
+_HOUR_TAG_CACHE = (-1, "")
+
+
+def _current_hour_tag() -> str:
+    """Return the temporal memory tag, recomputed only when the hour changes"""
+    global _HOUR_TAG_CACHE
+    epoch_hour = int(time.time()) // 3600
+    cached_hour, tag = _HOUR_TAG_CACHE
+    if epoch_hour != cached_hour:
+        tag = _HOUR_BUCKETS[epoch_hour % 24]
+        _HOUR_TAG_CACHE = (epoch_hour, tag)
+    return tag
+
 class MemoryManager:
     def __init__(self):
         """Initialize memory manager with proper database connection"""
@@ -21,9 +41,28 @@ class MemoryManager:
             )
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
             
-            # Test connection
+            # Test connection, and add the emotional_intensity column to tables
+            # created before it existed so writes don't depend on re-running setup
             with self.engine.connect() as conn:
                 conn.execute(text("SELECT 1"))
+                conn.execute(text("""
+                    ALTER TABLE IF EXISTS memory_experiences
+                    ADD COLUMN IF NOT EXISTS emotional_intensity FLOAT DEFAULT 0.0
+                """))
+                conn.commit()
+            
+            # Latest retrieval per user: user_id -> (limit, fetched_at, experiences).
+            # Writers may run on background threads, so access goes through the
+            # lock; the version moves on every invalidation so a fetch that
+            # raced a write is not cached.
+            self._experience_cache = {}
+            self._experience_cache_lock = threading.Lock()
+            self._experience_cache_version = 0
+            self.experience_cache_ttl = 15  # seconds
+            
+            # Callbacks taking a user_id, run whenever that user's stored
+            # experiences change so derived caches elsewhere can be dropped
+            self._invalidation_listeners = []
             
             print("💾 Memory Manager initialized with database connection")
             
@@ -33,29 +72,39 @@ class MemoryManager:
 
     def store_experience(self, user_id: str, experience: Dict[str, Any],
                         emotional_context: Dict[str, Any] = None,
-                        importance: float = 0.5) -> bool:
-        """Store a user experience in memory with proper error handling"""
+                        importance: float = 0.5,
+                        emotional_intensity: float = 0.0) -> bool:
+        """Store a user experience in memory with proper error handling.
+
+        Experiences with a message get a ``_features`` entry holding the
+        precomputed keyword mask, so pattern analysis does not re-scan the text.
+        """
         try:
             # Validate inputs
             if not user_id or not experience:
                 print("⚠️ Invalid input: user_id and experience required")
                 return False
             
+            if 'message' in experience and '_features' not in experience:
+                experience = {**experience, '_features': extract_message_features(experience['message'])}
+            
             importance = max(0.0, min(1.0, importance))  # Clamp between 0-1
             
             with self.engine.connect() as conn:
                 conn.execute(text("""
                     INSERT INTO memory_experiences
-                    (user_id, experience_data, emotional_context, importance_score)
-                    VALUES (:user_id, :experience_data, :emotional_context, :importance_score)
+                    (user_id, experience_data, emotional_context, importance_score, emotional_intensity)
+                    VALUES (:user_id, :experience_data, :emotional_context, :importance_score, :emotional_intensity)
                 """), {
                     "user_id": user_id,
                     "experience_data": json.dumps(experience, default=str),
                     "emotional_context": json.dumps(emotional_context or {}, default=str),
-                    "importance_score": importance
+                    "importance_score": importance,
+                    "emotional_intensity": emotional_intensity
                 })
                 conn.commit()
                 
+            self._invalidate_experiences(user_id)
             print(f"💾 Stored experience for user: {user_id}")
             return True
             
@@ -68,22 +117,22 @@ class MemoryManager:
                                 importance: float = 0.5) -> bool:
         """CORRECTED: Enhanced experience storage with proper integration"""
         try:
-            # Create enhanced experience data
-            enhanced_experience = experience.copy()
+            # Emotional intensity lives in its own column; emotional context is
+            # already persisted separately, so neither is copied into the blob
+            emotional_intensity = self._calculate_emotional_intensity(emotional_context)
             
-            # Add emotional intensity if emotional context provided
-            if emotional_context:
-                enhanced_experience['emotional_intensity'] = self._calculate_emotional_intensity(emotional_context)
-                enhanced_experience['memory_tags'] = self._generate_memory_tags(experience, emotional_context)
-            else:
-                enhanced_experience['emotional_intensity'] = 0.0
-                enhanced_experience['memory_tags'] = self._generate_memory_tags(experience, {})
+            # Build enhanced experience data in one allocation
+            enhanced_experience = {
+                **experience,
+                'memory_tags': self._generate_memory_tags(experience, emotional_context or {})
+            }
             
             # Calculate enhanced importance
             enhanced_importance = self._calculate_enhanced_importance(experience, emotional_context, importance)
             
             # Store using standard method
-            result = self.store_experience(user_id, enhanced_experience, emotional_context, enhanced_importance)
+            result = self.store_experience(user_id, enhanced_experience, emotional_context,
+                                           enhanced_importance, emotional_intensity)
             
             if result:
                 print(f"💾✨ Enhanced experience stored for {user_id}")
@@ -157,13 +206,7 @@ class MemoryManager:
                 tags.append(f"emotion:{emotion.lower()}")
         
         # Temporal tags
-        hour = int(time.time() % 86400 // 3600)
-        if 6 <= hour < 12:
-            tags.append("time:morning")
-        elif 12 <= hour < 18:
-            tags.append("time:afternoon")  
-        else:
-            tags.append("time:evening")
+        tags.append(_current_hour_tag())
         
         return list(set(tags))  # Remove duplicates
 
@@ -196,8 +239,90 @@ class MemoryManager:
         
         return min(importance, 1.0)
 
+    def _rows_to_experiences(self, rows, keep_unparsed: bool = True) -> List[Dict[str, Any]]:
+        """Decode memory_experiences row mappings into experience dicts.
+
+        Rows that fail to parse are replaced by a ``parsing_error`` placeholder
+        when ``keep_unparsed`` is set, otherwise they are skipped.
+        """
+        loads = json.loads
+        experiences = []
+        append = experiences.append
+
+        for row in rows:
+            exp_raw = row['experience_data']
+            emo_raw = row['emotional_context']
+            timestamp = row['timestamp']
+            importance = row['importance_score']
+            try:
+                # Robust JSON parsing
+                if isinstance(exp_raw, str):
+                    exp_data = loads(exp_raw)
+                elif isinstance(exp_raw, dict):
+                    exp_data = exp_raw
+                else:
+                    exp_data = {"content": str(exp_raw)}
+
+                if isinstance(emo_raw, str):
+                    emo_data = loads(emo_raw)
+                elif isinstance(emo_raw, dict):
+                    emo_data = emo_raw
+                else:
+                    emo_data = {}
+
+                append({
+                    "experience": exp_data,
+                    "emotional_context": emo_data,
+                    "timestamp": timestamp.isoformat() if hasattr(timestamp, 'isoformat') else str(timestamp),
+                    "importance": float(importance) if importance is not None else 0.5
+                })
+
+            except Exception as parse_error:
+                print(f"⚠️ Failed to parse experience row: {parse_error}")
+                if keep_unparsed:
+                    # Create fallback experience
+                    append({
+                        "experience": {"content": "parsing_error", "raw_data": str(exp_raw)},
+                        "emotional_context": {},
+                        "timestamp": str(timestamp) if timestamp else str(time.time()),
+                        "importance": 0.5
+                    })
+
+        return experiences
+
+    def add_invalidation_listener(self, listener):
+        """Call ``listener(user_id)`` whenever a user's stored experiences change"""
+        self._invalidation_listeners.append(listener)
+
+    def _invalidate_experiences(self, user_id: str):
+        """Drop the cached retrieval for a user after their stored rows change"""
+        with self._experience_cache_lock:
+            self._experience_cache.pop(user_id, None)
+            self._experience_cache_version += 1
+
+        for listener in self._invalidation_listeners:
+            try:
+                listener(user_id)
+            except Exception as e:
+                print(f"⚠️ Cache invalidation listener failed: {e}")
+
     def retrieve_experiences(self, user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """CORRECTED: Retrieve experiences with robust JSON parsing"""
+        """CORRECTED: Retrieve experiences, newest first, with robust JSON parsing.
+
+        Back-to-back requests for a user are served by slicing the latest
+        retrieval while it is fresh and at least as large as ``limit``.
+        Callers always get their own copies, so they may modify them freely.
+        """
+        with self._experience_cache_lock:
+            cached = self._experience_cache.get(user_id)
+            version = self._experience_cache_version
+        if cached:
+            cached_limit, fetched_at, cached_experiences = cached
+            # A short result already holds every stored row, so it covers any limit
+            covers_limit = cached_limit >= limit or len(cached_experiences) < cached_limit
+            if covers_limit and time.time() - fetched_at < self.experience_cache_ttl:
+                return copy.deepcopy(cached_experiences[:limit])
+
         try:
             with self.engine.connect() as conn:
                 result = conn.execute(text("""
@@ -208,48 +333,48 @@ class MemoryManager:
                     LIMIT :limit
                 """), {"user_id": user_id, "limit": limit})
 
-                experiences = []
-                for row in result:
-                    try:
-                        # Robust JSON parsing
-                        if isinstance(row.experience_data, str):
-                            exp_data = json.loads(row.experience_data)
-                        elif isinstance(row.experience_data, dict):
-                            exp_data = row.experience_data
-                        else:
-                            exp_data = {"content": str(row.experience_data)}
-                        
-                        if isinstance(row.emotional_context, str):
-                            emo_data = json.loads(row.emotional_context)
-                        elif isinstance(row.emotional_context, dict):
-                            emo_data = row.emotional_context
-                        else:
-                            emo_data = {}
-
-                        experiences.append({
-                            "experience": exp_data,
-                            "emotional_context": emo_data,
-                            "timestamp": row.timestamp.isoformat() if hasattr(row.timestamp, 'isoformat') else str(row.timestamp),
-                            "importance": float(row.importance_score) if row.importance_score is not None else 0.5
-                        })
-
-                    except Exception as parse_error:
-                        print(f"⚠️ Failed to parse experience row: {parse_error}")
-                        # Create fallback experience
-                        experiences.append({
-                            "experience": {"content": "parsing_error", "raw_data": str(row.experience_data)},
-                            "emotional_context": {},
-                            "timestamp": str(row.timestamp) if row.timestamp else str(time.time()),
-                            "importance": 0.5
-                        })
+                experiences = self._rows_to_experiences(result.mappings())
+                with self._experience_cache_lock:
+                    if version == self._experience_cache_version:
+                        self._experience_cache[user_id] = (limit, time.time(), experiences)
 
                 print(f"📖 Retrieved {len(experiences)} experiences for {user_id}")
-                return experiences
+                return copy.deepcopy(experiences)
 
         except Exception as e:
             print(f"❌ Failed to retrieve experiences: {e}")
             return []
 
+    def retrieve_experiences_batch(self, user_ids: List[str], limit: int = 10) -> Dict[str, List[Dict[str, Any]]]:
+        """Retrieve the latest experiences (newest first) of several users in one query"""
+        try:
+            with self.engine.connect() as conn:
+                result = conn.execute(text("""
+                    SELECT user_id, experience_data, emotional_context, timestamp, importance_score
+                    FROM (
+                        SELECT user_id, experience_data, emotional_context, timestamp, importance_score,
+                               ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY timestamp DESC) AS user_rank
+                        FROM memory_experiences
+                        WHERE user_id = ANY(:user_ids)
+                    ) ranked
+                    WHERE user_rank <= :limit
+                    ORDER BY user_id, timestamp DESC
+                """), {"user_ids": list(user_ids), "limit": limit})
+
+                rows_by_user = {user_id: [] for user_id in user_ids}
+                for row in result.mappings():
+                    rows_by_user.setdefault(row['user_id'], []).append(row)
+
+                experiences_by_user = {user_id: self._rows_to_experiences(rows)
+                                       for user_id, rows in rows_by_user.items()}
+
+                print(f"📖 Retrieved experiences for {len(experiences_by_user)} users")
+                return experiences_by_user
+
+        except Exception as e:
+            print(f"❌ Failed to retrieve experiences: {e}")
+            return {}
+
     def find_similar_experiences(self, user_id: str, query_text: str, limit: int = 5) -> List[Dict[str, Any]]:
         """CORRECTED: Find similar experiences with better search"""
         try:
@@ -267,34 +392,7 @@ class MemoryManager:
                     LIMIT :limit
                 """), {"user_id": user_id, "query": f"%{query_text}%", "limit": limit})
 
-                similar_experiences = []
-                for row in result:
-                    try:
-                        # Use same parsing logic as retrieve_experiences
-                        if isinstance(row.experience_data, str):
-                            exp_data = json.loads(row.experience_data)
-                        elif isinstance(row.experience_data, dict):
-                            exp_data = row.experience_data
-                        else:
-                            exp_data = {"content": str(row.experience_data)}
-
-                        if isinstance(row.emotional_context, str):
-                            emo_data = json.loads(row.emotional_context)
-                        elif isinstance(row.emotional_context, dict):
-                            emo_data = row.emotional_context
-                        else:
-                            emo_data = {}
-
-                        similar_experiences.append({
-                            "experience": exp_data,
-                            "emotional_context": emo_data,
-                            "timestamp": row.timestamp.isoformat() if hasattr(row.timestamp, 'isoformat') else str(row.timestamp),
-                            "importance": float(row.importance_score) if row.importance_score is not None else 0.5
-                        })
-
-                    except Exception as parse_error:
-                        print(f"⚠️ Failed to parse similar experience: {parse_error}")
-                        continue
+                similar_experiences = self._rows_to_experiences(result.mappings(), keep_unparsed=False)
 
                 print(f"🔍 Found {len(similar_experiences)} similar experiences")
                 return similar_experiences
@@ -311,6 +409,7 @@ class MemoryManager:
                 count_result = conn.execute(text("""
                     SELECT COUNT(*) as total_count,
                            AVG(importance_score) as avg_importance,
+                           AVG(emotional_intensity) as avg_emotional_intensity,
                            MAX(timestamp) as latest_timestamp,
                            MIN(timestamp) as earliest_timestamp
                     FROM memory_experiences
@@ -323,6 +422,7 @@ class MemoryManager:
                     return {
                         "total_experiences": int(row.total_count),
                         "average_importance": round(float(row.avg_importance), 2),
+                        "average_emotional_intensity": round(float(row.avg_emotional_intensity or 0.0), 2),
                         "latest_timestamp": str(row.latest_timestamp) if row.latest_timestamp else None,
                         "earliest_timestamp": str(row.earliest_timestamp) if row.earliest_timestamp else None,
                         "memory_health": "excellent" if row.total_count > 50 else "good" if row.total_count > 10 else "developing"
@@ -374,6 +474,7 @@ class MemoryManager:
                 
                 conn.commit()
                 deleted_count = result.rowcount
+                self._invalidate_experiences(user_id)
                 
                 if deleted_count > 0:
                     print(f"🗑️ Cleaned up {deleted_count} old experiences for {user_id}")
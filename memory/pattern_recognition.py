@@ -2,12 +2,100 @@
 CORRECTED Pattern Recognition Engine - Fixed missing analyze_all_patterns method
 """
 
-import json
+import copy
+import logging
 import time
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import islice
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
-from collections import Counter, defaultdict
+from datetime import datetime
+from heapq import nlargest
+from operator import itemgetter
+import numpy as np
 from memory.memory_manager import MemoryManager
+from memory.text_features import (
+    STRESS_BIT, POSITIVE_BIT, NEGATIVE_BIT, HELP_BIT, FEATURES_VERSION,
+    message_mask, mask_topics
+)
+
+logger = logging.getLogger(__name__)
+
+def _normalize_iso(timestamp_str: str) -> str:
+    """Make a trailing 'Z' UTC designator parseable by datetime.fromisoformat"""
+    return timestamp_str[:-1] + '+00:00' if timestamp_str.endswith('Z') else timestamp_str
+
+
+# behavioral, emotional, temporal, communication and help-seeking
+_PATTERN_CATEGORY_COUNT = 5
+
+# (user_id, days) analyses kept for reuse; the oldest entry is evicted first
+MAX_CACHED_ANALYSES = 128
+
+# Shared read-only stand-in for a missing experience payload
+_EMPTY: Dict[str, Any] = {}
+
+
+def _looks_like_epoch(timestamp_str: str) -> bool:
+    """True for fractional epoch strings, which have a '.' but no date or time separators"""
+    return (isinstance(timestamp_str, str) and '.' in timestamp_str
+            and not any(separator in timestamp_str for separator in '-:T '))
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp(timestamp_str: str) -> Optional[datetime]:
+    """Parse an ISO-8601 or epoch-seconds timestamp, returning None if invalid.
+
+    Cached because successive analyses re-read mostly the same rows.
+    """
+    # Fractional epoch strings (str(time.time())) can never be ISO dates, so
+    # send them straight to float() instead of through a raised ValueError
+    if not _looks_like_epoch(timestamp_str):
+        try:
+            return datetime.fromisoformat(_normalize_iso(timestamp_str))
+        except (ValueError, TypeError, AttributeError):
+            pass
+    try:
+        return datetime.fromtimestamp(float(timestamp_str))
+    except (ValueError, TypeError, OverflowError, OSError):
+        return None
+
+
+# Insight rules in output order; mutually exclusive pairs check the label they defer to
+_INSIGHT_RULES = (
+    # Behavioral insights
+    (lambda view: 'concise_communicator' in view["labels"],
+     "Provide brief, direct responses - user prefers concise communication"),
+    (lambda view: 'detailed_communicator' in view["labels"] and 'concise_communicator' not in view["labels"],
+     "User appreciates detailed explanations - provide comprehensive responses"),
+
+    # Emotional insights
+    (lambda view: view["stress_frequency"] > 0.3,
+     "Monitor for stress indicators and offer proactive support"),
+    (lambda view: 'emotionally_stable' in view["labels"],
+     "User maintains good emotional balance - focus on maintaining current strategies"),
+    (lambda view: 'high_stress_frequency' in view["labels"] and 'emotionally_stable' not in view["labels"],
+     "Consider stress management interventions and regular check-ins"),
+
+    # Temporal insights
+    (lambda view: 'morning_active' in view["labels"],
+     "Schedule important interactions for morning hours when user is most active"),
+    (lambda view: 'evening_active' in view["labels"] and 'morning_active' not in view["labels"],
+     "User is most active in evenings - optimize support for after-hours"),
+
+    # Communication insights
+    (lambda view: 'inquisitive' in view["labels"],
+     "User asks many questions - prepare comprehensive explanations"),
+    (lambda view: 'expressive' in view["labels"],
+     "User communicates expressively - match energy level in responses"),
+
+    # Help-seeking insights
+    (lambda view: view["help_frequency"] > 0.3,
+     "User benefits from proactive assistance - anticipate needs before explicit requests"),
+    (lambda view: view["help_frequency"] < 0.1,
+     "User prefers independence - offer suggestions rather than detailed guidance")
+)
+
 
 class PatternRecognitionEngine:
     def __init__(self, memory_manager: MemoryManager = None):
@@ -18,38 +106,84 @@ class PatternRecognitionEngine:
         self.confidence_threshold = 0.6
         self.analysis_window_days = 14
         
-        print("🔍 Pattern Recognition Engine initialized")
+        # Recent analyses per (user_id, days): (fingerprint, computed_at, result)
+        self._analysis_cache = {}
+        self.analysis_cache_ttl = 60  # seconds
+        
+        logger.debug("🔍 Pattern Recognition Engine initialized")
+
+    def analyze_all_patterns(self, user_id: str, days: int = 14,
+                             experiences: Optional[List[Dict]] = None) -> Dict[str, Any]:
+        """FIXED: Main method for comprehensive pattern analysis.
 
-    def analyze_all_patterns(self, user_id: str, days: int = 14) -> Dict[str, Any]:
-        """FIXED: Main method for comprehensive pattern analysis"""
-        print(f"🔍 Running comprehensive pattern analysis for {user_id}...")
+        ``experiences`` may be supplied already retrieved (newest first);
+        otherwise the latest 200 are fetched from the memory manager.
+        """
+        logger.debug("🔍 Running comprehensive pattern analysis for %s...", user_id)
         
         try:
             # Get experiences from memory manager
-            experiences = self.memory_manager.retrieve_experiences(user_id, 200)
+            if experiences is None:
+                experiences = self.memory_manager.retrieve_experiences(user_id, 200)
             
             if not experiences:
                 return self._empty_analysis_result("Insufficient interaction data")
 
-            # Filter experiences by time window if needed
-            cutoff_time = datetime.now() - timedelta(days=days)
-            recent_experiences = []
-            
-            for exp in experiences:
-                try:
-                    timestamp_str = exp.get('timestamp', '')
-                    if timestamp_str:
-                        exp_time = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                        if exp_time >= cutoff_time:
-                            recent_experiences.append(exp)
-                except:
-                    # Include experiences with invalid timestamps
-                    recent_experiences.append(exp)
+            # Reuse the previous analysis while the experience window is unchanged
+            cache_key = (user_id, days)
+            fingerprint = (len(experiences), experiences[0].get('timestamp'))
+            cached = self._analysis_cache.get(cache_key)
+            if cached and cached[0] == fingerprint and time.time() - cached[1] < self.analysis_cache_ttl:
+                return copy.deepcopy(cached[2])
+
+            # Parse every timestamp once; the results are reused by the temporal detector
+            times = [_parse_timestamp(exp.get('timestamp', '')) for exp in experiences]
+
+            # Experiences arrive newest first, so the time window is a prefix of
+            # the parsed timestamps; unparseable ones just hold their neighbour's place
+            sort_keys = []
+            sort_key = float('-inf')
+            for exp_time in times:
+                if exp_time is not None:
+                    sort_key = -exp_time.timestamp()
+                sort_keys.append(sort_key)
+            cutoff_ts = time.time() - days * 86400
+            window_end = bisect_right(sort_keys, -cutoff_ts)
+
+            # As before, experiences with an unparseable timestamp are always kept
+            # and those without one are left out
+            if all(exp_time is not None for exp_time in times):
+                recent_experiences = experiences[:window_end]
+                recent_times = times[:window_end]
+            else:
+                keep = [index for index, exp_time in enumerate(times)
+                        if (index < window_end if exp_time is not None
+                            else experiences[index].get('timestamp'))]
+                recent_experiences = [experiences[index] for index in keep]
+                recent_times = [times[index] for index in keep]
             
             if not recent_experiences:
-                recent_experiences = experiences[:50]  # Use recent 50 if time filtering fails
+                # Use recent 50 if time filtering fails
+                recent_experiences = experiences[:50]
+                recent_times = times[:50]
+
+            # Walk the experiences once and share the aggregates across detectors
+            scan = self._scan_experiences(self._to_columns(recent_experiences, recent_times))
 
             # Run all pattern analyses
+            behavioral_patterns = self._detect_behavioral_patterns(scan)
+            emotional_patterns = self._detect_emotional_patterns(scan)
+            temporal_patterns = self._detect_temporal_patterns(scan)
+            communication_patterns = self._detect_communication_patterns(scan)
+            help_seeking_patterns = self._detect_help_seeking_patterns(scan)
+
+            # Detected labels in category order, gathered straight from the detectors
+            all_patterns = (behavioral_patterns["detected_behaviors"] +
+                            emotional_patterns["emotional_trends"] +
+                            temporal_patterns["activity_periods"] +
+                            communication_patterns["communication_style"] +
+                            help_seeking_patterns["problem_solving_style"])
+
             analysis_result = {
                 "user_id": user_id,
                 "analysis_timestamp": time.time(),
@@ -57,11 +191,11 @@ class PatternRecognitionEngine:
                 "analysis_period_days": days,
                 
                 # Pattern categories
-                "behavioral_patterns": self._detect_behavioral_patterns(recent_experiences),
-                "emotional_patterns": self._detect_emotional_patterns(recent_experiences),
-                "temporal_patterns": self._detect_temporal_patterns(recent_experiences),
-                "communication_patterns": self._detect_communication_patterns(recent_experiences),
-                "help_seeking_patterns": self._detect_help_seeking_patterns(recent_experiences),
+                "behavioral_patterns": behavioral_patterns,
+                "emotional_patterns": emotional_patterns,
+                "temporal_patterns": temporal_patterns,
+                "communication_patterns": communication_patterns,
+                "help_seeking_patterns": help_seeking_patterns,
                 
                 # Overall insights
                 "pattern_summary": {},
@@ -70,18 +204,124 @@ class PatternRecognitionEngine:
             }
 
             # Generate summary and insights
-            analysis_result["pattern_summary"] = self._generate_pattern_summary(analysis_result)
+            analysis_result["pattern_summary"] = self._generate_pattern_summary(all_patterns)
             analysis_result["confidence_score"] = self._calculate_overall_confidence(analysis_result)
             analysis_result["actionable_insights"] = self._generate_insights(analysis_result)
 
-            print(f"✅ Pattern analysis complete: {analysis_result['confidence_score']:.2f} confidence")
+            # Cache a private copy; the caller may modify what it is returned
+            self._analysis_cache.pop(cache_key, None)
+            if len(self._analysis_cache) >= MAX_CACHED_ANALYSES:
+                self._analysis_cache.pop(next(iter(self._analysis_cache)))
+            self._analysis_cache[cache_key] = (fingerprint, time.time(), copy.deepcopy(analysis_result))
+
+            logger.debug("✅ Pattern analysis complete: %.2f confidence", analysis_result['confidence_score'])
             return analysis_result
 
         except Exception as e:
-            print(f"❌ Pattern analysis failed: {e}")
+            logger.error("❌ Pattern analysis failed: %s", e)
             return self._empty_analysis_result(f"Analysis error: {str(e)}")
 
-    def _detect_behavioral_patterns(self, experiences: List[Dict]) -> Dict[str, Any]:
+    def _to_columns(self, experiences: List[Dict], times: List[Optional[datetime]]) -> Dict[str, List]:
+        """Flatten experiences into parallel per-field columns"""
+        payloads = [exp.get('experience') or _EMPTY for exp in experiences]
+        messages = [exp_data.get('message', '') for exp_data in payloads]
+        messages_lower = [message.lower() for message in messages]
+        types = [exp_data.get('type') for exp_data in payloads]
+
+        # Prefer keyword masks precomputed at write time by MemoryManager
+        masks = []
+        for exp_data, message_lower in zip(payloads, messages_lower):
+            features = exp_data.get('_features')
+            if isinstance(features, dict) and features.get('version') == FEATURES_VERSION:
+                masks.append(features['mask'])
+            else:
+                masks.append(message_mask(message_lower))
+
+        return {
+            "message": messages,
+            "message_lower": messages_lower,
+            "mask": masks,
+            "type": types,
+            "emotional_context": [exp_data.get('emotional_context') or _EMPTY for exp_data in payloads],
+            "time": times
+        }
+
+    def _scan_experiences(self, columns: Dict[str, List]) -> Dict[str, Any]:
+        """Collect every aggregate the pattern detectors need in a single pass"""
+        scan = {
+            "total_messages": len(columns["message"]),
+            "user_message_count": 0,
+            "total_length": 0,
+            "topic_counts": {},
+            "stress_count": 0,
+            "emotion_counts": {},
+            "total_intensity": 0.0,
+            "emotional_experience_count": 0,
+            "hours": [exp_time.hour for exp_time in columns["time"] if exp_time is not None],
+            "question_count": 0,
+            "exclamation_count": 0,
+            "help_request_count": 0,
+            "help_topic_counts": {}
+        }
+        emotion_counts = scan["emotion_counts"]
+        topic_counts = scan["topic_counts"]
+        help_topic_counts = scan["help_topic_counts"]
+
+        # Topic consistency is only reported once there are enough user messages
+        track_topics = columns["type"].count('user_message') >= self.min_pattern_occurrences
+
+        for message, message_lower, mask, exp_type, emotional_context in zip(
+                columns["message"], columns["message_lower"], columns["mask"],
+                columns["type"], columns["emotional_context"]):
+
+            # Emotional indicators (all experiences)
+            if mask & STRESS_BIT:
+                scan["stress_count"] += 1
+                emotion_counts['stress'] = emotion_counts.get('stress', 0) + 1
+
+            if mask & POSITIVE_BIT:
+                emotion_counts['positive'] = emotion_counts.get('positive', 0) + 1
+
+            if mask & NEGATIVE_BIT:
+                emotion_counts['negative'] = emotion_counts.get('negative', 0) + 1
+
+            if emotional_context:
+                scan["emotional_experience_count"] += 1
+                if isinstance(emotional_context, dict):
+                    for emotion, value in emotional_context.items():
+                        emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
+                        if isinstance(value, (int, float)):
+                            scan["total_intensity"] += value
+                        else:
+                            scan["total_intensity"] += 0.5
+
+            # Behavioral, communication and help-seeking aggregates (user messages only)
+            if exp_type != 'user_message':
+                continue
+
+            scan["user_message_count"] += 1
+            scan["total_length"] += len(message)
+            if '?' in message:
+                scan["question_count"] += 1
+            if '!' in message:
+                scan["exclamation_count"] += 1
+
+            is_help_request = mask & HELP_BIT
+            if is_help_request:
+                scan["help_request_count"] += 1
+
+            if track_topics or is_help_request:
+                topics = mask_topics(mask)
+                if track_topics:
+                    for topic in topics:
+                        topic_counts[topic] = topic_counts.get(topic, 0) + 1
+                if is_help_request:
+                    for topic in topics:
+                        help_topic_counts[topic] = help_topic_counts.get(topic, 0) + 1
+
+        return scan
+
+    def _detect_behavioral_patterns(self, scan: Dict[str, Any]) -> Dict[str, Any]:
         """Detect behavioral patterns in user interactions"""
         patterns = {
             "detected_behaviors": [],
@@ -89,36 +329,29 @@ class PatternRecognitionEngine:
             "consistency_score": 0.0
         }
 
-        user_messages = [exp for exp in experiences
-                        if exp.get('experience', {}).get('type') == 'user_message']
-
-        if len(user_messages) >= self.min_pattern_occurrences:
-            # Message length patterns
-            lengths = [len(exp.get('experience', {}).get('message', '')) for exp in user_messages]
-            if lengths:
-                avg_length = sum(lengths) / len(lengths)
-                if avg_length < 30:
-                    patterns["detected_behaviors"].append("concise_communicator")
-                elif avg_length > 100:
-                    patterns["detected_behaviors"].append("detailed_communicator")
-
-            # Topic consistency
-            topics = []
-            for exp in user_messages:
-                message = exp.get('experience', {}).get('message', '').lower()
-                topics.extend(self._extract_topics(message))
-
-            if topics:
-                topic_counts = Counter(topics)
-                dominant_topics = [topic for topic, count in topic_counts.items() if count >= 3]
-                if dominant_topics:
-                    patterns["detected_behaviors"].append(f"focus_on_{dominant_topics[0]}")
-                    patterns["behavior_frequency"] = dict(topic_counts.most_common(5))
+        user_message_count = scan["user_message_count"]
+        if user_message_count < self.min_pattern_occurrences:
+            return patterns
+
+        # Message length patterns
+        avg_length = scan["total_length"] / user_message_count
+        if avg_length < 30:
+            patterns["detected_behaviors"].append("concise_communicator")
+        elif avg_length > 100:
+            patterns["detected_behaviors"].append("detailed_communicator")
+
+        # Topic consistency
+        topic_counts = scan["topic_counts"]
+        if topic_counts:
+            dominant_topics = [topic for topic, count in topic_counts.items() if count >= 3]
+            if dominant_topics:
+                patterns["detected_behaviors"].append(f"focus_on_{dominant_topics[0]}")
+                patterns["behavior_frequency"] = dict(nlargest(5, topic_counts.items(), key=itemgetter(1)))
 
         patterns["consistency_score"] = min(len(patterns["detected_behaviors"]) * 0.2, 1.0)
         return patterns
 
-    def _detect_emotional_patterns(self, experiences: List[Dict]) -> Dict[str, Any]:
+    def _detect_emotional_patterns(self, scan: Dict[str, Any]) -> Dict[str, Any]:
         """Detect emotional patterns and trends"""
         patterns = {
             "emotional_trends": [],
@@ -127,46 +360,11 @@ class PatternRecognitionEngine:
             "dominant_emotions": {}
         }
 
-        # Extract emotional data
-        emotional_experiences = []
-        stress_count = 0
-        total_intensity = 0.0
-        emotion_counts = defaultdict(int)
-
-        for exp in experiences:
-            exp_data = exp.get('experience', {})
-            message = exp_data.get('message', '').lower()
-            emotional_context = exp_data.get('emotional_context', {})
-            
-            # Check for stress indicators in message
-            if any(word in message for word in ['stress', 'overwhelmed', 'anxiety', 'worried', 'pressure']):
-                stress_count += 1
-                emotion_counts['stress'] += 1
-
-            # Check for positive emotions
-            if any(word in message for word in ['happy', 'excited', 'great', 'good', 'amazing']):
-                emotion_counts['positive'] += 1
-
-            # Check for negative emotions
-            if any(word in message for word in ['sad', 'upset', 'frustrated', 'angry', 'disappointed']):
-                emotion_counts['negative'] += 1
-
-            # Process stored emotional context
-            if emotional_context:
-                emotional_experiences.append(exp_data)
-                if isinstance(emotional_context, dict):
-                    for emotion, value in emotional_context.items():
-                        emotion_counts[emotion] += 1
-                        if isinstance(value, (int, float)):
-                            total_intensity += value
-                        else:
-                            total_intensity += 0.5
-
-        total_messages = len(experiences)
+        total_messages = scan["total_messages"]
         if total_messages > 0:
-            patterns["stress_frequency"] = stress_count / total_messages
-            patterns["emotional_stability"] = max(0.0, 1.0 - (total_intensity / max(1, len(emotional_experiences))))
-            patterns["dominant_emotions"] = dict(Counter(emotion_counts).most_common(5))
+            patterns["stress_frequency"] = scan["stress_count"] / total_messages
+            patterns["emotional_stability"] = max(0.0, 1.0 - (scan["total_intensity"] / max(1, scan["emotional_experience_count"])))
+            patterns["dominant_emotions"] = dict(nlargest(5, scan["emotion_counts"].items(), key=itemgetter(1)))
 
             # Detect emotional trends
             if patterns["stress_frequency"] > 0.3:
@@ -178,7 +376,7 @@ class PatternRecognitionEngine:
 
         return patterns
 
-    def _detect_temporal_patterns(self, experiences: List[Dict]) -> Dict[str, Any]:
+    def _detect_temporal_patterns(self, scan: Dict[str, Any]) -> Dict[str, Any]:
         """Detect temporal patterns in user activity"""
         patterns = {
             "activity_periods": [],
@@ -186,45 +384,30 @@ class PatternRecognitionEngine:
             "schedule_consistency": 0.0
         }
 
-        # Extract timestamps
-        timestamps = []
-        for exp in experiences:
-            timestamp_str = exp.get('timestamp', '')
-            if timestamp_str:
-                try:
-                    if 'T' in timestamp_str:
-                        dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                    else:
-                        dt = datetime.fromtimestamp(float(timestamp_str))
-                    timestamps.append(dt.hour)
-                except (ValueError, TypeError):
-                    continue
-
-        if len(timestamps) >= self.min_pattern_occurrences:
-            # Analyze hourly activity
-            hour_counts = Counter(timestamps)
-            
-            if hour_counts:
-                max_activity = max(hour_counts.values())
-                peak_hours = [hour for hour, count in hour_counts.items()
-                             if count >= max_activity * 0.7]
-                patterns["peak_hours"] = sorted(peak_hours)
-
-                # Determine activity periods
-                if any(6 <= hour < 12 for hour in peak_hours):
-                    patterns["activity_periods"].append("morning_active")
-                if any(12 <= hour < 18 for hour in peak_hours):
-                    patterns["activity_periods"].append("afternoon_active")
-                if any(18 <= hour <= 23 or 0 <= hour < 6 for hour in peak_hours):
-                    patterns["activity_periods"].append("evening_active")
-
-                # Calculate schedule consistency
-                active_hours_count = len([h for h in range(24) if hour_counts.get(h, 0) > 0])
-                patterns["schedule_consistency"] = max(0.0, 1.0 - (active_hours_count / 24.0))
+        timestamps = scan["hours"]
+        if len(timestamps) < self.min_pattern_occurrences:
+            return patterns
+
+        # Analyze hourly activity
+        hour_counts = np.bincount(np.fromiter(timestamps, dtype=np.intp, count=len(timestamps)), minlength=24)
+        is_peak = hour_counts >= hour_counts.max() * 0.7
+        patterns["peak_hours"] = np.flatnonzero(is_peak).tolist()
+
+        # Determine activity periods from slices of the peak mask
+        if is_peak[6:12].any():
+            patterns["activity_periods"].append("morning_active")
+        if is_peak[12:18].any():
+            patterns["activity_periods"].append("afternoon_active")
+        if is_peak[18:24].any() or is_peak[0:6].any():
+            patterns["activity_periods"].append("evening_active")
+
+        # Calculate schedule consistency
+        active_hours_count = int(np.count_nonzero(hour_counts))
+        patterns["schedule_consistency"] = max(0.0, 1.0 - (active_hours_count / 24.0))
 
         return patterns
 
-    def _detect_communication_patterns(self, experiences: List[Dict]) -> Dict[str, Any]:
+    def _detect_communication_patterns(self, scan: Dict[str, Any]) -> Dict[str, Any]:
         """Detect communication style patterns"""
         patterns = {
             "communication_style": [],
@@ -232,35 +415,21 @@ class PatternRecognitionEngine:
             "interaction_frequency": 0.0
         }
 
-        user_messages = [exp for exp in experiences
-                        if exp.get('experience', {}).get('type') == 'user_message']
-
-        if user_messages:
+        total_messages = scan["user_message_count"]
+        if total_messages > 0:
             # Analyze communication style
-            question_count = 0
-            exclamation_count = 0
-            
-            for exp in user_messages:
-                message = exp.get('experience', {}).get('message', '')
-                if '?' in message:
-                    question_count += 1
-                if '!' in message:
-                    exclamation_count += 1
-
-            total_messages = len(user_messages)
-            if total_messages > 0:
-                if question_count / total_messages > 0.4:
-                    patterns["communication_style"].append("inquisitive")
-                if exclamation_count / total_messages > 0.3:
-                    patterns["communication_style"].append("expressive")
-
-                # Calculate interaction frequency (messages per day estimate)
-                time_span = max(7, self.analysis_window_days)
-                patterns["interaction_frequency"] = len(user_messages) / time_span
+            if scan["question_count"] / total_messages > 0.4:
+                patterns["communication_style"].append("inquisitive")
+            if scan["exclamation_count"] / total_messages > 0.3:
+                patterns["communication_style"].append("expressive")
+
+            # Calculate interaction frequency (messages per day estimate)
+            time_span = max(7, self.analysis_window_days)
+            patterns["interaction_frequency"] = total_messages / time_span
 
         return patterns
 
-    def _detect_help_seeking_patterns(self, experiences: List[Dict]) -> Dict[str, Any]:
+    def _detect_help_seeking_patterns(self, scan: Dict[str, Any]) -> Dict[str, Any]:
         """Detect help-seeking behavior patterns"""
         patterns = {
             "help_frequency": 0.0,
@@ -268,30 +437,14 @@ class PatternRecognitionEngine:
             "problem_solving_style": []
         }
 
-        help_requests = []
-        user_messages = []
-
-        for exp in experiences:
-            exp_data = exp.get('experience', {})
-            if exp_data.get('type') == 'user_message':
-                message = exp_data.get('message', '').lower()
-                user_messages.append(message)
-                
-                help_indicators = ['help', 'assist', 'support', 'stuck', 'confused', 'how to', 'need']
-                if any(indicator in message for indicator in help_indicators):
-                    help_requests.append(message)
-
-        if user_messages:
-            patterns["help_frequency"] = len(help_requests) / len(user_messages)
+        user_message_count = scan["user_message_count"]
+        if user_message_count:
+            patterns["help_frequency"] = scan["help_request_count"] / user_message_count
 
             # Analyze help topics
-            all_topics = []
-            for request in help_requests:
-                all_topics.extend(self._extract_topics(request))
-
-            if all_topics:
-                topic_counter = Counter(all_topics)
-                patterns["help_topics"] = [topic for topic, count in topic_counter.most_common(3)]
+            help_topic_counts = scan["help_topic_counts"]
+            if help_topic_counts:
+                patterns["help_topics"] = [topic for topic, count in nlargest(3, help_topic_counts.items(), key=itemgetter(1))]
 
             # Determine problem-solving style
             if patterns["help_frequency"] > 0.3:
@@ -303,50 +456,11 @@ class PatternRecognitionEngine:
 
         return patterns
 
-    def _extract_topics(self, message: str) -> List[str]:
-        """Extract topics from message text"""
-        topics = []
-        message_lower = message.lower()
-
-        topic_keywords = {
-            'work': ['work', 'job', 'career', 'office', 'project', 'deadline', 'meeting'],
-            'stress': ['stress', 'overwhelmed', 'pressure', 'anxiety', 'worried'],
-            'time': ['time', 'schedule', 'busy', 'calendar', 'manage', 'planning'],
-            'health': ['health', 'tired', 'sleep', 'exercise', 'wellness', 'fitness'],
-            'learning': ['learn', 'understand', 'study', 'confused', 'education'],
-            'technology': ['computer', 'software', 'app', 'technical', 'digital'],
-            'relationship': ['family', 'friend', 'colleague', 'relationship', 'social'],
-            'productivity': ['productive', 'efficient', 'organize', 'focus', 'task'],
-            'emotional': ['feel', 'emotion', 'mood', 'upset', 'happy', 'sad']
-        }
-
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in message_lower for keyword in keywords):
-                topics.append(topic)
-
-        return topics
-
-    def _generate_pattern_summary(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_pattern_summary(self, all_patterns: List[str]) -> Dict[str, Any]:
         """Generate summary of all detected patterns"""
-        all_patterns = []
-
-        # Collect all detected patterns
-        for category, data in analysis.items():
-            if isinstance(data, dict):
-                if 'detected_behaviors' in data:
-                    all_patterns.extend(data.get('detected_behaviors', []))
-                if 'emotional_trends' in data:
-                    all_patterns.extend(data.get('emotional_trends', []))
-                if 'activity_periods' in data:
-                    all_patterns.extend(data.get('activity_periods', []))
-                if 'communication_style' in data:
-                    all_patterns.extend(data.get('communication_style', []))
-                if 'problem_solving_style' in data:
-                    all_patterns.extend(data.get('problem_solving_style', []))
-
         return {
             "total_patterns_detected": len(all_patterns),
-            "pattern_categories": len([k for k in analysis.keys() if k.endswith('_patterns')]),
+            "pattern_categories": _PATTERN_CATEGORY_COUNT,
             "strongest_patterns": all_patterns[:5] if all_patterns else [],
             "pattern_diversity": len(set(all_patterns)) if all_patterns else 0
         }
@@ -369,133 +483,126 @@ class PatternRecognitionEngine:
 
     def _generate_insights(self, analysis: Dict[str, Any]) -> List[str]:
         """Generate actionable insights from patterns"""
-        insights = []
-
-        # Behavioral insights
         behavioral = analysis.get('behavioral_patterns', {})
-        detected_behaviors = behavioral.get('detected_behaviors', [])
-        
-        if 'concise_communicator' in detected_behaviors:
-            insights.append("Provide brief, direct responses - user prefers concise communication")
-        elif 'detailed_communicator' in detected_behaviors:
-            insights.append("User appreciates detailed explanations - provide comprehensive responses")
-
-        # Emotional insights
         emotional = analysis.get('emotional_patterns', {})
-        if emotional.get('stress_frequency', 0) > 0.3:
-            insights.append("Monitor for stress indicators and offer proactive support")
-        
-        if 'emotionally_stable' in emotional.get('emotional_trends', []):
-            insights.append("User maintains good emotional balance - focus on maintaining current strategies")
-        elif 'high_stress_frequency' in emotional.get('emotional_trends', []):
-            insights.append("Consider stress management interventions and regular check-ins")
-
-        # Temporal insights
         temporal = analysis.get('temporal_patterns', {})
-        activity_periods = temporal.get('activity_periods', [])
-        
-        if 'morning_active' in activity_periods:
-            insights.append("Schedule important interactions for morning hours when user is most active")
-        elif 'evening_active' in activity_periods:
-            insights.append("User is most active in evenings - optimize support for after-hours")
-
-        # Communication insights
         communication = analysis.get('communication_patterns', {})
-        comm_style = communication.get('communication_style', [])
-        
-        if 'inquisitive' in comm_style:
-            insights.append("User asks many questions - prepare comprehensive explanations")
-        if 'expressive' in comm_style:
-            insights.append("User communicates expressively - match energy level in responses")
-
-        # Help-seeking insights
         help_seeking = analysis.get('help_seeking_patterns', {})
-        if help_seeking.get('help_frequency', 0) > 0.3:
-            insights.append("User benefits from proactive assistance - anticipate needs before explicit requests")
-        elif help_seeking.get('help_frequency', 0) < 0.1:
-            insights.append("User prefers independence - offer suggestions rather than detailed guidance")
 
-        return insights[:7]
+        # Flatten the nested analysis once; rules only read this view
+        view = {
+            "labels": set(behavioral.get('detected_behaviors', [])).union(
+                emotional.get('emotional_trends', []),
+                temporal.get('activity_periods', []),
+                communication.get('communication_style', [])),
+            "stress_frequency": emotional.get('stress_frequency', 0),
+            "help_frequency": help_seeking.get('help_frequency', 0)
+        }
+
+        return list(islice((insight for applies, insight in _INSIGHT_RULES if applies(view)), 7))
+
+    def predict_user_needs(self, user_id: str, experiences: Optional[List[Dict]] = None) -> Dict[str, Any]:
+        """CORRECTED: Predict user needs based on comprehensive pattern analysis.
 
-    def predict_user_needs(self, user_id: str) -> Dict[str, Any]:
-        """CORRECTED: Predict user needs based on comprehensive pattern analysis"""
-        print(f"🔮 Predicting user needs for {user_id}...")
+        ``experiences`` is forwarded to analyze_all_patterns so callers that
+        already hold the user's experiences avoid another retrieval.
+        """
+        logger.debug("🔮 Predicting user needs for %s...", user_id)
 
         try:
             # Get comprehensive pattern analysis
-            analysis = self.analyze_all_patterns(user_id, 7)
-            
-            predictions = []
-            
-            # Extract pattern data correctly
-            emotional_patterns = analysis.get('emotional_patterns', {})
-            behavioral_patterns = analysis.get('behavioral_patterns', {})
-            help_seeking_patterns = analysis.get('help_seeking_patterns', {})
-            communication_patterns = analysis.get('communication_patterns', {})
-
-            print(f"DEBUG: Emotional stress frequency: {emotional_patterns.get('stress_frequency', 0)}")
-            print(f"DEBUG: Help seeking frequency: {help_seeking_patterns.get('help_frequency', 0)}")
-
-            # Stress management prediction
-            stress_freq = emotional_patterns.get('stress_frequency', 0.0)
-            if stress_freq > 0.2:  # Lowered threshold
-                predictions.append({
-                    "predicted_need": "stress_management_support",
-                    "confidence": min(0.9, 0.6 + (stress_freq * 0.4)),
-                    "reasoning": f"Stress detected in {stress_freq:.1%} of recent interactions",
-                    "suggested_actions": ["Proactive stress monitoring", "Stress relief techniques"]
-                })
-                print(f"✅ Added stress prediction (confidence: {min(0.9, 0.6 + (stress_freq * 0.4)):.2f})")
-
-            # Help-seeking prediction
-            help_freq = help_seeking_patterns.get('help_frequency', 0.0)
-            if help_freq > 0.15:  # Lowered threshold
-                predictions.append({
-                    "predicted_need": "proactive_assistance",
-                    "confidence": min(0.85, 0.5 + (help_freq * 0.5)),
-                    "reasoning": f"User requests help frequently ({help_freq:.1%} of messages)",
-                    "suggested_actions": ["Anticipate needs", "Proactive guidance"]
-                })
-                print(f"✅ Added help prediction (confidence: {min(0.85, 0.5 + (help_freq * 0.5)):.2f})")
-
-            # Communication pattern prediction
-            comm_freq = communication_patterns.get('interaction_frequency', 0.0)
-            if comm_freq > 1.0:  # More than 1 message per day
-                predictions.append({
-                    "predicted_need": "engagement_optimization",
-                    "confidence": 0.7,
-                    "reasoning": f"High interaction frequency ({comm_freq:.1f} messages/day)",
-                    "suggested_actions": ["Regular engagement", "Response optimization"]
-                })
-                print(f"✅ Added engagement prediction (confidence: 0.7)")
-
-            # Calculate overall confidence
-            overall_confidence = 0.0
-            if predictions:
-                confidences = [p['confidence'] for p in predictions]
-                overall_confidence = sum(confidences) / len(confidences)
-
-            result = {
-                "predictions": predictions,
-                "prediction_confidence": round(overall_confidence, 2),
-                "based_on_experiences": len(self.memory_manager.retrieve_experiences(user_id, 10)),
-                "analysis_used": {
-                    "emotional_patterns": bool(emotional_patterns),
-                    "behavioral_patterns": bool(behavioral_patterns),
-                    "help_seeking_patterns": bool(help_seeking_patterns),
-                    "communication_patterns": bool(communication_patterns)
-                }
-            }
-
-            print(f"✅ Generated {len(predictions)} predictions with {overall_confidence:.2f} confidence")
-            return result
+            analysis = self.analyze_all_patterns(user_id, 7, experiences)
+            return self._predict_from_analysis(analysis)
 
         except Exception as e:
-            print(f"❌ Prediction failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Prediction failed: %s", e)
             return {"predictions": [], "prediction_confidence": 0.0, "error": str(e)}
 
+    def predict_user_needs_batch(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Predict needs for several users from a single experience retrieval"""
+        logger.debug("🔮 Predicting user needs for %d users...", len(user_ids))
+
+        experiences_by_user = self.memory_manager.retrieve_experiences_batch(user_ids, 200)
+
+        results = {}
+        for user_id in user_ids:
+            experiences = experiences_by_user.get(user_id, [])
+            try:
+                analysis = self.analyze_all_patterns(user_id, 7, experiences)
+                results[user_id] = self._predict_from_analysis(analysis)
+            except Exception as e:
+                logger.exception("❌ Prediction failed for %s: %s", user_id, e)
+                results[user_id] = {"predictions": [], "prediction_confidence": 0.0, "error": str(e)}
+
+        return results
+
+    def _predict_from_analysis(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Turn a pattern analysis into need predictions"""
+        predictions = []
+        
+        # Extract pattern data correctly
+        emotional_patterns = analysis.get('emotional_patterns', {})
+        behavioral_patterns = analysis.get('behavioral_patterns', {})
+        help_seeking_patterns = analysis.get('help_seeking_patterns', {})
+        communication_patterns = analysis.get('communication_patterns', {})
+
+        logger.debug("Emotional stress frequency: %s", emotional_patterns.get('stress_frequency', 0))
+        logger.debug("Help seeking frequency: %s", help_seeking_patterns.get('help_frequency', 0))
+
+        # Stress management prediction
+        stress_freq = emotional_patterns.get('stress_frequency', 0.0)
+        if stress_freq > 0.2:  # Lowered threshold
+            predictions.append({
+                "predicted_need": "stress_management_support",
+                "confidence": min(0.9, 0.6 + (stress_freq * 0.4)),
+                "reasoning": f"Stress detected in {stress_freq:.1%} of recent interactions",
+                "suggested_actions": ["Proactive stress monitoring", "Stress relief techniques"]
+            })
+            logger.debug("✅ Added stress prediction (confidence: %.2f)", predictions[-1]["confidence"])
+
+        # Help-seeking prediction
+        help_freq = help_seeking_patterns.get('help_frequency', 0.0)
+        if help_freq > 0.15:  # Lowered threshold
+            predictions.append({
+                "predicted_need": "proactive_assistance",
+                "confidence": min(0.85, 0.5 + (help_freq * 0.5)),
+                "reasoning": f"User requests help frequently ({help_freq:.1%} of messages)",
+                "suggested_actions": ["Anticipate needs", "Proactive guidance"]
+            })
+            logger.debug("✅ Added help prediction (confidence: %.2f)", predictions[-1]["confidence"])
+
+        # Communication pattern prediction
+        comm_freq = communication_patterns.get('interaction_frequency', 0.0)
+        if comm_freq > 1.0:  # More than 1 message per day
+            predictions.append({
+                "predicted_need": "engagement_optimization",
+                "confidence": 0.7,
+                "reasoning": f"High interaction frequency ({comm_freq:.1f} messages/day)",
+                "suggested_actions": ["Regular engagement", "Response optimization"]
+            })
+            logger.debug("✅ Added engagement prediction (confidence: 0.7)")
+
+        # Calculate overall confidence
+        overall_confidence = 0.0
+        if predictions:
+            confidences = [p['confidence'] for p in predictions]
+            overall_confidence = sum(confidences) / len(confidences)
+
+        result = {
+            "predictions": predictions,
+            "prediction_confidence": round(overall_confidence, 2),
+            "based_on_experiences": analysis.get('total_experiences', 0),
+            "analysis_used": {
+                "emotional_patterns": bool(emotional_patterns),
+                "behavioral_patterns": bool(behavioral_patterns),
+                "help_seeking_patterns": bool(help_seeking_patterns),
+                "communication_patterns": bool(communication_patterns)
+            }
+        }
+
+        logger.debug("✅ Generated %d predictions with %.2f confidence", len(predictions), overall_confidence)
+        return result
+
     def _empty_analysis_result(self, reason: str) -> Dict[str, Any]:
         """Return empty analysis result with reason"""
         return {
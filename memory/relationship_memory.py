@@ -5,20 +5,96 @@ Tracks relationships with people, places, concepts with emotional context
 
 import json
 import time
+from contextlib import contextmanager
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict, Counter
-from sqlalchemy import create_engine, Column, String, Float, DateTime, Text, Integer
+from functools import lru_cache
+from sqlalchemy import create_engine, Column, String, Float, DateTime, Text, Integer, UniqueConstraint, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.dialects.postgresql import JSONB, UUID, insert as pg_insert
+from sqlalchemy.ext.mutable import MutableDict, MutableList
 from sqlalchemy.orm import sessionmaker
 import uuid
 import re
 
 Base = declarative_base()
 
+# Interactions kept per relationship; older ones are dropped on update
+MAX_INTERACTION_HISTORY = 50
+
+# Emotion keys that mark an interaction as positive or negative
+_POSITIVE_EMOTIONS = frozenset(['positive', 'happy', 'excited', 'grateful'])
+_NEGATIVE_EMOTIONS = frozenset(['stress', 'frustrated', 'angry', 'sad', 'negative'])
+
+# Entity indicators in extraction order: (entity name, entity type, keywords)
+_PEOPLE_INDICATORS = ('my boss', 'my manager', 'my colleague', 'my friend', 'my family', 'my partner', 'my spouse')
+_PLACE_INDICATORS = ('office', 'home', 'work', 'gym', 'school', 'hospital', 'store', 'restaurant')
+_CONCEPT_INDICATORS = {
+    'work_project': ('project', 'assignment', 'task', 'deadline'),
+    'health': ('exercise', 'diet', 'sleep', 'medical'),
+    'learning': ('course', 'study', 'learn', 'education'),
+    'technology': ('computer', 'app', 'software', 'phone'),
+    'finance': ('money', 'budget', 'salary', 'expense')
+}
+_ENTITY_SPECS = (
+    tuple((indicator.replace('my ', ''), 'person', (indicator,)) for indicator in _PEOPLE_INDICATORS) +
+    tuple((place, 'place', (place,)) for place in _PLACE_INDICATORS) +
+    tuple((concept, 'concept', keywords) for concept, keywords in _CONCEPT_INDICATORS.items())
+)
+
+# Every indicator in one alternation; the lookahead reports overlapping mentions
+# too, so this matches the plain substring checks (no indicator prefixes another)
+_ENTITY_RE = re.compile('(?=(' + '|'.join(
+    re.escape(keyword) for _, _, keywords in _ENTITY_SPECS for keyword in keywords) + '))')
+
+
+@lru_cache(maxsize=4096)
+def _extract_entities(message: str) -> Tuple[Tuple[str, str, str], ...]:
+    """(name, type, context) of every entity mentioned in the message.
+
+    Extraction depends on the text alone, so repeated messages (greetings,
+    status pings) are served from the cache.
+    """
+    # First position of every indicator, from a single scan of the message
+    first_positions = {}
+    for match in _ENTITY_RE.finditer(message.lower()):
+        first_positions.setdefault(match.group(1), match.start())
+
+    if not first_positions:
+        return ()
+
+    entities = []
+    for entity_name, entity_type, keywords in _ENTITY_SPECS:
+        for keyword in keywords:
+            start = first_positions.get(keyword)
+            if start is not None:
+                # Context window of 20 characters around the mention
+                context = message[max(0, start - 20):start + len(keyword) + 20].strip()
+                entities.append((entity_name, entity_type, context))
+                break
+
+    return tuple(entities)
+
+
+@lru_cache(maxsize=4096)
+def _message_context_tags(message_lower: str) -> Tuple[str, ...]:
+    """Context tags derived from the interaction message text"""
+    tags = []
+    if 'work' in message_lower:
+        tags.append('context:work')
+    if 'help' in message_lower:
+        tags.append('context:help')
+    if 'problem' in message_lower or 'issue' in message_lower:
+        tags.append('context:problem')
+    if 'good' in message_lower or 'great' in message_lower:
+        tags.append('context:positive')
+    return tuple(tags)
+
+
 class RelationshipEntity(Base):
     __tablename__ = 'relationship_entities'
+    # One row per (user, entity); the constraint's index also serves every lookup
+    __table_args__ = (UniqueConstraint('user_id', 'entity_name', name='uq_relationship_user_entity'),)
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id = Column(String(255), nullable=False)
@@ -26,9 +102,9 @@ class RelationshipEntity(Base):
     entity_type = Column(String(100), nullable=False)  # person, place, concept, topic
     
     # Core relationship data
-    relationship_data = Column(JSONB, default={})
-    interaction_history = Column(JSONB, default=[])
-    emotional_associations = Column(JSONB, default={})
+    relationship_data = Column(MutableDict.as_mutable(JSONB), default=dict)
+    interaction_history = Column(MutableList.as_mutable(JSONB), default=list)
+    emotional_associations = Column(MutableDict.as_mutable(JSONB), default=dict)
     
     # Relationship metrics
     relationship_strength = Column(Float, default=0.0)
@@ -43,7 +119,7 @@ class RelationshipEntity(Base):
     negative_interactions = Column(Integer, default=0)
     
     # Context tags for better search
-    context_tags = Column(JSONB, default=[])
+    context_tags = Column(MutableList.as_mutable(JSONB), default=list)
 
 class RelationshipMemoryNetwork:
     def __init__(self, memory_manager=None):
@@ -56,178 +132,182 @@ class RelationshipMemoryNetwork:
                 self.SessionLocal = memory_manager.SessionLocal
             else:
                 # Create SessionLocal if memory_manager doesn't have it
-                from sqlalchemy.orm import sessionmaker
                 self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         else:
-            # Create independent database connection
+            # Create independent database connection, pooled like MemoryManager's
             from config.settings import settings
-            from sqlalchemy import create_engine
-            from sqlalchemy.orm import sessionmaker
             
-            self.engine = create_engine(settings.POSTGRES_URL)
+            self.engine = create_engine(
+                settings.POSTGRES_URL,
+                pool_size=5,
+                max_overflow=10,
+                pool_recycle=3600,
+                pool_pre_ping=True
+            )
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         
         # Create tables
         Base.metadata.create_all(bind=self.engine)
         print("🤝 Relationship Memory Network initialized")
 
+    @contextmanager
+    def _session(self):
+        """Session scope: commit on success, roll back on error, always close"""
+        session = self.SessionLocal()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
     
     def extract_entities_from_message(self, message: str, user_id: str = "user") -> List[Dict[str, Any]]:
         """Extract people, places, concepts from message"""
-        entities = []
-        message_lower = message.lower()
-        
-        # Extract people (simple name detection)
-        people_indicators = ['my boss', 'my manager', 'my colleague', 'my friend', 'my family', 'my partner', 'my spouse']
-        for indicator in people_indicators:
-            if indicator in message_lower:
-                entity_name = indicator.replace('my ', '')
-                entities.append({
-                    'name': entity_name,
-                    'type': 'person',
-                    'context': self._extract_context_around_entity(message, indicator)
-                })
-        
-        # Extract places
-        place_indicators = ['office', 'home', 'work', 'gym', 'school', 'hospital', 'store', 'restaurant']
-        for place in place_indicators:
-            if place in message_lower:
-                entities.append({
-                    'name': place,
-                    'type': 'place',
-                    'context': self._extract_context_around_entity(message, place)
-                })
-        
-        # Extract concepts/topics
-        concept_indicators = {
-            'work_project': ['project', 'assignment', 'task', 'deadline'],
-            'health': ['exercise', 'diet', 'sleep', 'medical'],
-            'learning': ['course', 'study', 'learn', 'education'],
-            'technology': ['computer', 'app', 'software', 'phone'],
-            'finance': ['money', 'budget', 'salary', 'expense']
-        }
-        
-        for concept, keywords in concept_indicators.items():
-            if any(keyword in message_lower for keyword in keywords):
-                entities.append({
-                    'name': concept,
-                    'type': 'concept',
-                    'context': self._extract_context_around_entity(message, keywords[0])
-                })
-        
-        return entities
-    
-    def _extract_context_around_entity(self, message: str, entity: str, window: int = 20) -> str:
-        """Extract context around entity mention"""
-        try:
-            start = max(0, message.lower().find(entity.lower()) - window)
-            end = min(len(message), message.lower().find(entity.lower()) + len(entity) + window)
-            return message[start:end].strip()
-        except:
-            return message[:50]  # Fallback to first 50 chars
+        return [{'name': entity_name, 'type': entity_type, 'context': context}
+                for entity_name, entity_type, context in _extract_entities(message)]
     
     def update_relationship_from_interaction(self, user_id: str, message: str, emotional_context: Dict[str, Any] = None):
-        """Update relationships based on user interaction"""
+        """Update relationships based on user interaction.
+
+        All entities of the message are looked up with one query and written
+        in a single transaction, each under its own savepoint so a failed
+        entity doesn't roll back the others.
+        """
         entities = self.extract_entities_from_message(message, user_id)
+        if not entities:
+            return
         
-        for entity in entities:
-            self.add_or_update_relationship(
-                user_id=user_id,
-                entity_name=entity['name'],
-                entity_type=entity['type'],
-                interaction_data={
-                    'message': message,
-                    'context': entity['context'],
-                    'timestamp': datetime.utcnow().isoformat(),
-                    'emotional_context': emotional_context or {}
-                },
-                emotional_associations=emotional_context or {}
-            )
+        timestamp = datetime.utcnow().isoformat()
+        try:
+            with self._session() as session:
+                existing = {
+                    relationship.entity_name: relationship
+                    for relationship in session.query(RelationshipEntity).filter(
+                        RelationshipEntity.user_id == user_id,
+                        RelationshipEntity.entity_name.in_([entity['name'] for entity in entities])
+                    )
+                }
+                
+                for entity in entities:
+                    try:
+                        with session.begin_nested():
+                            self._apply_interaction(
+                                session,
+                                existing.get(entity['name']),
+                                user_id=user_id,
+                                entity_name=entity['name'],
+                                entity_type=entity['type'],
+                                interaction_data={
+                                    'message': message,
+                                    'context': entity['context'],
+                                    'timestamp': timestamp,
+                                    'emotional_context': emotional_context or {}
+                                },
+                                emotional_associations=emotional_context or {}
+                            )
+                    except Exception as e:
+                        print(f"❌ Failed to update relationship with {entity['name']}: {e}")
+                
+        except Exception as e:
+            print(f"❌ Failed to update relationships: {e}")
     
     def add_or_update_relationship(self, user_id: str, entity_name: str, entity_type: str,
                                  interaction_data: Dict[str, Any],
                                  emotional_associations: Dict[str, Any] = None) -> bool:
         """Add or update relationship with comprehensive tracking"""
-        session = self.SessionLocal()
-        
         try:
-            # Check if relationship exists
-            relationship = session.query(RelationshipEntity).filter_by(
-                user_id=user_id,
-                entity_name=entity_name
-            ).first()
-            
-            if relationship:
-                # Update existing relationship
-                relationship.interaction_history.append(interaction_data)
-                relationship.total_interactions += 1
-                relationship.last_interaction = datetime.utcnow()
-                
-                # Update emotional associations
-                if emotional_associations:
-                    current_emotions = relationship.emotional_associations or {}
-                    for emotion, intensity in emotional_associations.items():
-                        if emotion in current_emotions:
-                            # Weighted average of emotions
-                            current_emotions[emotion] = (current_emotions[emotion] + intensity) / 2
-                        else:
-                            current_emotions[emotion] = intensity
-                    relationship.emotional_associations = current_emotions
-                
-                # Update relationship metrics
-                relationship.familiarity = min(1.0, relationship.total_interactions / 20.0)
-                
-                # Determine if interaction was positive or negative
-                if emotional_associations:
-                    is_positive = any(emotion in ['positive', 'happy', 'excited', 'grateful'] 
-                                    for emotion in emotional_associations.keys())
-                    is_negative = any(emotion in ['stress', 'frustrated', 'angry', 'sad'] 
-                                    for emotion in emotional_associations.keys())
-                    
-                    if is_positive:
-                        relationship.positive_interactions += 1
-                    elif is_negative:
-                        relationship.negative_interactions += 1
-                
-                # Calculate relationship strength
-                total_emotional_interactions = relationship.positive_interactions + relationship.negative_interactions
-                if total_emotional_interactions > 0:
-                    positivity_ratio = relationship.positive_interactions / total_emotional_interactions
-                    relationship.relationship_strength = (relationship.familiarity * 0.6 + positivity_ratio * 0.4)
-                else:
-                    relationship.relationship_strength = relationship.familiarity * 0.5
-                
-                print(f"🔄 Updated relationship with {entity_name} (strength: {relationship.relationship_strength:.2f})")
-                
-            else:
-                # Create new relationship
-                new_relationship = RelationshipEntity(
+            with self._session() as session:
+                # Check if relationship exists
+                relationship = session.query(RelationshipEntity).filter_by(
                     user_id=user_id,
-                    entity_name=entity_name,
-                    entity_type=entity_type,
-                    interaction_history=[interaction_data],
-                    emotional_associations=emotional_associations or {},
-                    relationship_strength=0.1,
-                    familiarity=0.05,
-                    trust_level=0.5,
-                    total_interactions=1,
-                    positive_interactions=1 if emotional_associations and any(e in ['positive', 'happy'] for e in emotional_associations.keys()) else 0,
-                    negative_interactions=1 if emotional_associations and any(e in ['stress', 'negative'] for e in emotional_associations.keys()) else 0,
-                    context_tags=self._generate_context_tags(interaction_data, emotional_associations)
-                )
+                    entity_name=entity_name
+                ).first()
                 
-                session.add(new_relationship)
-                print(f"🆕 Created new relationship with {entity_name}")
-            
-            session.commit()
-            return True
+                self._apply_interaction(session, relationship, user_id, entity_name, entity_type,
+                                        interaction_data, emotional_associations)
+                return True
             
         except Exception as e:
-            session.rollback()
             print(f"❌ Failed to update relationship: {e}")
             return False
-        finally:
-            session.close()
+    
+    def _apply_interaction(self, session, relationship: Optional[RelationshipEntity], user_id: str,
+                           entity_name: str, entity_type: str, interaction_data: Dict[str, Any],
+                           emotional_associations: Dict[str, Any] = None):
+        """Record one interaction on an existing relationship, or insert a new one.
+
+        New entities are inserted with ON CONFLICT DO NOTHING on (user_id,
+        entity_name); if another writer created the entity first, the
+        interaction is applied to that row instead.
+        """
+        if relationship:
+            # Update existing relationship, keeping only the most recent interactions
+            relationship.interaction_history.append(interaction_data)
+            if len(relationship.interaction_history) > MAX_INTERACTION_HISTORY:
+                del relationship.interaction_history[:-MAX_INTERACTION_HISTORY]
+            relationship.total_interactions += 1
+            relationship.last_interaction = datetime.utcnow()
+        
+            # Update emotional associations
+            if emotional_associations:
+                current_emotions = relationship.emotional_associations or {}
+                for emotion, intensity in emotional_associations.items():
+                    previous = current_emotions.get(emotion)
+                    # Weighted average of emotions
+                    current_emotions[emotion] = intensity if previous is None else (previous + intensity) * 0.5
+                relationship.emotional_associations = current_emotions
+        
+            # Update relationship metrics
+            relationship.familiarity = min(1.0, relationship.total_interactions / 20.0)
+        
+            # Determine if interaction was positive or negative
+            if emotional_associations:
+                if not _POSITIVE_EMOTIONS.isdisjoint(emotional_associations):
+                    relationship.positive_interactions += 1
+                elif not _NEGATIVE_EMOTIONS.isdisjoint(emotional_associations):
+                    relationship.negative_interactions += 1
+        
+            # Calculate relationship strength
+            total_emotional_interactions = relationship.positive_interactions + relationship.negative_interactions
+            if total_emotional_interactions > 0:
+                positivity_ratio = relationship.positive_interactions / total_emotional_interactions
+                relationship.relationship_strength = (relationship.familiarity * 0.6 + positivity_ratio * 0.4)
+            else:
+                relationship.relationship_strength = relationship.familiarity * 0.5
+        
+            print(f"🔄 Updated relationship with {entity_name} (strength: {relationship.relationship_strength:.2f})")
+        
+        else:
+            # Create new relationship
+            created = session.execute(pg_insert(RelationshipEntity).values(
+                user_id=user_id,
+                entity_name=entity_name,
+                entity_type=entity_type,
+                interaction_history=[interaction_data],
+                emotional_associations=emotional_associations or {},
+                relationship_strength=0.1,
+                familiarity=0.05,
+                trust_level=0.5,
+                total_interactions=1,
+                positive_interactions=1 if emotional_associations and not _POSITIVE_EMOTIONS.isdisjoint(emotional_associations) else 0,
+                negative_interactions=1 if emotional_associations and not _NEGATIVE_EMOTIONS.isdisjoint(emotional_associations) else 0,
+                context_tags=self._generate_context_tags(interaction_data, emotional_associations)
+            ).on_conflict_do_nothing(index_elements=['user_id', 'entity_name'])).rowcount
+        
+            if created:
+                print(f"🆕 Created new relationship with {entity_name}")
+                return
+            
+            # Lost the insert race; record the interaction on the other writer's row
+            relationship = session.query(RelationshipEntity).filter_by(
+                user_id=user_id,
+                entity_name=entity_name
+            ).one()
+            self._apply_interaction(session, relationship, user_id, entity_name, entity_type,
+                                    interaction_data, emotional_associations)
     
     def _generate_context_tags(self, interaction_data: Dict[str, Any], emotional_associations: Dict[str, Any] = None) -> List[str]:
         """Generate context tags for better relationship search"""
@@ -239,132 +319,138 @@ class RelationshipMemoryNetwork:
                 tags.append(f"emotion:{emotion}")
         
         # Add context-based tags
-        message = interaction_data.get('message', '').lower()
-        if 'work' in message:
-            tags.append('context:work')
-        if 'help' in message:
-            tags.append('context:help')
-        if 'problem' in message or 'issue' in message:
-            tags.append('context:problem')
-        if 'good' in message or 'great' in message:
-            tags.append('context:positive')
+        tags.extend(_message_context_tags(interaction_data.get('message', '').lower()))
         
         return tags
     
     def get_relationship(self, user_id: str, entity_name: str) -> Optional[Dict[str, Any]]:
         """Get detailed relationship information"""
-        session = self.SessionLocal()
         try:
-            relationship = session.query(RelationshipEntity).filter_by(
-                user_id=user_id,
-                entity_name=entity_name
-            ).first()
+            with self._session() as session:
+                relationship = session.query(RelationshipEntity).filter_by(
+                    user_id=user_id,
+                    entity_name=entity_name
+                ).first()
             
-            if relationship:
-                return {
-                    "entity_name": relationship.entity_name,
-                    "entity_type": relationship.entity_type,
-                    "relationship_strength": relationship.relationship_strength,
-                    "trust_level": relationship.trust_level,
-                    "familiarity": relationship.familiarity,
-                    "emotional_associations": relationship.emotional_associations,
-                    "total_interactions": relationship.total_interactions,
-                    "positive_interactions": relationship.positive_interactions,
-                    "negative_interactions": relationship.negative_interactions,
-                    "first_interaction": relationship.first_interaction.isoformat(),
-                    "last_interaction": relationship.last_interaction.isoformat(),
-                    "recent_interactions": relationship.interaction_history[-5:],  # Last 5
-                    "context_tags": relationship.context_tags
-                }
-            return None
+                if relationship:
+                    return {
+                        "entity_name": relationship.entity_name,
+                        "entity_type": relationship.entity_type,
+                        "relationship_strength": relationship.relationship_strength,
+                        "trust_level": relationship.trust_level,
+                        "familiarity": relationship.familiarity,
+                        "emotional_associations": relationship.emotional_associations,
+                        "total_interactions": relationship.total_interactions,
+                        "positive_interactions": relationship.positive_interactions,
+                        "negative_interactions": relationship.negative_interactions,
+                        "first_interaction": relationship.first_interaction.isoformat(),
+                        "last_interaction": relationship.last_interaction.isoformat(),
+                        "recent_interactions": relationship.interaction_history[-5:],  # Last 5
+                        "context_tags": relationship.context_tags
+                    }
+                return None
             
         except Exception as e:
             print(f"❌ Failed to get relationship: {e}")
             return None
-        finally:
-            session.close()
     
     def get_relationship_network(self, user_id: str) -> Dict[str, Any]:
-        """Get comprehensive relationship network analysis"""
-        session = self.SessionLocal()
+        """Get comprehensive relationship network analysis.
+
+        Counts, strength buckets, top entities and the emotional profile are
+        aggregated in Postgres, so no relationship rows are loaded.
+        """
         try:
-            relationships = session.query(RelationshipEntity).filter_by(user_id=user_id).all()
+            with self._session() as session:
+                type_rows = session.execute(text("""
+                    SELECT entity_type,
+                           COUNT(*) AS entity_count,
+                           SUM(COALESCE(relationship_strength, 0.0)) AS total_strength,
+                           COUNT(*) FILTER (WHERE relationship_strength > 0.7) AS strong_count,
+                           COUNT(*) FILTER (WHERE relationship_strength > 0.4
+                                            AND relationship_strength <= 0.7) AS moderate_count
+                    FROM relationship_entities
+                    WHERE user_id = :user_id
+                    GROUP BY entity_type
+                """), {"user_id": user_id}).mappings().all()
             
-            if not relationships:
-                return {"total_relationships": 0, "network_health": "no_data"}
+                if not type_rows:
+                    return {"total_relationships": 0, "network_health": "no_data"}
             
-            # Analyze relationship network
-            network_stats = {
-                "total_relationships": len(relationships),
-                "by_type": defaultdict(int),
-                "by_strength": {"strong": 0, "moderate": 0, "weak": 0},
-                "emotional_profile": defaultdict(float),
-                "most_interacted": [],
-                "relationship_trends": [],
-                "network_health": "healthy"
-            }
-            
-            total_strength = 0
-            all_emotions = []
+                # Analyze relationship network
+                network_stats = {
+                    "total_relationships": 0,
+                    "by_type": {},
+                    "by_strength": {"strong": 0, "moderate": 0, "weak": 0},
+                    "emotional_profile": {},
+                    "most_interacted": [],
+                    "relationship_trends": [],
+                    "network_health": "healthy"
+                }
             
-            for rel in relationships:
-                # Count by type
-                network_stats["by_type"][rel.entity_type] += 1
-                
-                # Count by strength
-                if rel.relationship_strength > 0.7:
-                    network_stats["by_strength"]["strong"] += 1
-                elif rel.relationship_strength > 0.4:
-                    network_stats["by_strength"]["moderate"] += 1
-                else:
-                    network_stats["by_strength"]["weak"] += 1
-                
-                total_strength += rel.relationship_strength
-                
-                # Collect emotional data
-                if rel.emotional_associations:
-                    all_emotions.extend(rel.emotional_associations.keys())
+                total_strength = 0.0
+                for row in type_rows:
+                    entity_count = int(row['entity_count'])
+                    strong_count = int(row['strong_count'])
+                    moderate_count = int(row['moderate_count'])
                 
-                # Track most interacted
-                network_stats["most_interacted"].append({
-                    "name": rel.entity_name,
-                    "type": rel.entity_type,
-                    "interactions": rel.total_interactions,
-                    "strength": rel.relationship_strength
-                })
+                    network_stats["total_relationships"] += entity_count
+                    network_stats["by_type"][row['entity_type']] = entity_count
+                    network_stats["by_strength"]["strong"] += strong_count
+                    network_stats["by_strength"]["moderate"] += moderate_count
+                    network_stats["by_strength"]["weak"] += entity_count - strong_count - moderate_count
+                    total_strength += float(row['total_strength'])
             
-            # Calculate network metrics
-            network_stats["average_relationship_strength"] = total_strength / len(relationships)
+                total_relationships = network_stats["total_relationships"]
             
-            # Sort most interacted
-            network_stats["most_interacted"].sort(key=lambda x: x["interactions"], reverse=True)
-            network_stats["most_interacted"] = network_stats["most_interacted"][:5]
+                # Calculate network metrics
+                network_stats["average_relationship_strength"] = total_strength / total_relationships
             
-            # Emotional profile
-            if all_emotions:
-                emotion_counts = Counter(all_emotions)
-                total_emotions = sum(emotion_counts.values())
-                for emotion, count in emotion_counts.items():
-                    network_stats["emotional_profile"][emotion] = count / total_emotions
+                # Most interacted
+                top_rows = session.execute(text("""
+                    SELECT entity_name, entity_type, total_interactions, relationship_strength
+                    FROM relationship_entities
+                    WHERE user_id = :user_id
+                    ORDER BY total_interactions DESC NULLS LAST
+                    LIMIT 5
+                """), {"user_id": user_id}).mappings()
+                network_stats["most_interacted"] = [{
+                    "name": row['entity_name'],
+                    "type": row['entity_type'],
+                    "interactions": row['total_interactions'],
+                    "strength": row['relationship_strength']
+                } for row in top_rows]
             
-            # Network health assessment
-            strong_ratio = network_stats["by_strength"]["strong"] / len(relationships)
-            if strong_ratio > 0.3:
-                network_stats["network_health"] = "excellent"
-            elif strong_ratio > 0.1:
-                network_stats["network_health"] = "good"
-            elif network_stats["average_relationship_strength"] > 0.3:
-                network_stats["network_health"] = "developing"
-            else:
-                network_stats["network_health"] = "needs_attention"
+                # Emotional profile: share of each emotion among all association keys
+                emotion_rows = session.execute(text("""
+                    SELECT emotion, COUNT(*) AS emotion_count
+                    FROM relationship_entities,
+                         jsonb_object_keys(CASE WHEN jsonb_typeof(emotional_associations) = 'object'
+                                                THEN emotional_associations ELSE '{}'::jsonb END) AS emotion
+                    WHERE user_id = :user_id
+                    GROUP BY emotion
+                """), {"user_id": user_id}).all()
+                if emotion_rows:
+                    total_emotions = sum(emotion_count for _, emotion_count in emotion_rows)
+                    for emotion, emotion_count in emotion_rows:
+                        network_stats["emotional_profile"][emotion] = emotion_count / total_emotions
+            
+                # Network health assessment
+                strong_ratio = network_stats["by_strength"]["strong"] / total_relationships
+                if strong_ratio > 0.3:
+                    network_stats["network_health"] = "excellent"
+                elif strong_ratio > 0.1:
+                    network_stats["network_health"] = "good"
+                elif network_stats["average_relationship_strength"] > 0.3:
+                    network_stats["network_health"] = "developing"
+                else:
+                    network_stats["network_health"] = "needs_attention"
             
-            return dict(network_stats)
+                return network_stats
             
         except Exception as e:
             print(f"❌ Failed to analyze relationship network: {e}")
             return {"error": str(e)}
-        finally:
-            session.close()
     
     def get_relationship_insights(self, user_id: str) -> List[str]:
         """Generate insights about user's relationship patterns"""
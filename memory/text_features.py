@@ -0,0 +1,131 @@
+"""
+Shared keyword features for experience messages - vocabularies and integer keyword masks
+"""
+
+import re
+from typing import Dict, Any, Tuple
+
+# Keyword vocabularies, built once at import
+TOPIC_KEYWORDS = {
+    'work': frozenset(['work', 'job', 'career', 'office', 'project', 'deadline', 'meeting']),
+    'stress': frozenset(['stress', 'overwhelmed', 'pressure', 'anxiety', 'worried']),
+    'time': frozenset(['time', 'schedule', 'busy', 'calendar', 'manage', 'planning']),
+    'health': frozenset(['health', 'tired', 'sleep', 'exercise', 'wellness', 'fitness']),
+    'learning': frozenset(['learn', 'understand', 'study', 'confused', 'education']),
+    'technology': frozenset(['computer', 'software', 'app', 'technical', 'digital']),
+    'relationship': frozenset(['family', 'friend', 'colleague', 'relationship', 'social']),
+    'productivity': frozenset(['productive', 'efficient', 'organize', 'focus', 'task']),
+    'emotional': frozenset(['feel', 'emotion', 'mood', 'upset', 'happy', 'sad'])
+}
+STRESS_WORDS = frozenset(['stress', 'overwhelmed', 'anxiety', 'worried', 'pressure'])
+POSITIVE_WORDS = frozenset(['happy', 'excited', 'great', 'good', 'amazing'])
+NEGATIVE_WORDS = frozenset(['sad', 'upset', 'frustrated', 'angry', 'disappointed'])
+HELP_WORDS = frozenset(['help', 'assist', 'support', 'stuck', 'confused', 'how to', 'need'])
+
+
+# Message signal bits; a message's keyword mask is the OR of the signals it mentions
+STRESS_BIT = 1 << 0
+POSITIVE_BIT = 1 << 1
+NEGATIVE_BIT = 1 << 2
+HELP_BIT = 1 << 3
+
+# Topic bits sit above the signal bits, in TOPIC_KEYWORDS order
+_TOPIC_SHIFT = 4
+TOPIC_BITS = {topic: 1 << (_TOPIC_SHIFT + index) for index, topic in enumerate(TOPIC_KEYWORDS)}
+BIT_TO_TOPIC = {bit: topic for topic, bit in TOPIC_BITS.items()}
+TOPIC_MASK = sum(TOPIC_BITS.values())
+
+
+def _build_keyword_masks() -> Dict[str, int]:
+    """Map every keyword to the bits of all vocabularies it matches.
+
+    A keyword also carries the bits of any shorter keyword it contains
+    ('happy' contains 'app'), so reading only the longest match at each
+    position still reproduces plain substring semantics.
+    """
+    vocabularies = [(STRESS_BIT, STRESS_WORDS), (POSITIVE_BIT, POSITIVE_WORDS),
+                    (NEGATIVE_BIT, NEGATIVE_WORDS), (HELP_BIT, HELP_WORDS)]
+    vocabularies.extend((TOPIC_BITS[topic], keywords) for topic, keywords in TOPIC_KEYWORDS.items())
+
+    own_bits = {}
+    for bit, keywords in vocabularies:
+        for keyword in keywords:
+            own_bits[keyword] = own_bits.get(keyword, 0) | bit
+
+    keyword_masks = {}
+    for keyword in own_bits:
+        mask = 0
+        for other, bits in own_bits.items():
+            if other in keyword:
+                mask |= bits
+        keyword_masks[keyword] = mask
+    return keyword_masks
+
+
+def _trie_pattern(keywords) -> str:
+    """Render keywords as a prefix-trie regex so shared prefixes are tested once"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def render(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + render(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A keyword ending here makes the longer continuations optional
+        return '(?:' + body + ')?' if '' in node else body
+
+    return render(trie)
+
+
+_KEYWORD_MASKS = _build_keyword_masks()
+
+# One automaton-style pass over the message: the lookahead reports the longest
+# keyword starting at every position, including overlapping ones
+_KEYWORD_RE = re.compile('(?=(' + _trie_pattern(_KEYWORD_MASKS) + '))')
+
+
+def message_mask(message_lower: str) -> int:
+    """Classify a lowercased message into an integer mask of its signals and topics"""
+    mask = 0
+    keyword_masks = _KEYWORD_MASKS
+    for keyword in _KEYWORD_RE.findall(message_lower):
+        mask |= keyword_masks[keyword]
+    return mask
+
+
+def _expand_topic_bits(mask: int) -> Tuple[str, ...]:
+    """Expand the topic bits of a mask into topic names, lowest bit first"""
+    topics = []
+    mask &= TOPIC_MASK
+    while mask:
+        bit = mask & -mask
+        topics.append(BIT_TO_TOPIC[bit])
+        mask ^= bit
+    return tuple(topics)
+
+
+# The vocabulary is fixed, so every possible topic combination is expanded once at import
+_TOPICS_BY_MASK = tuple(_expand_topic_bits(index << _TOPIC_SHIFT) for index in range(1 << len(TOPIC_BITS)))
+
+
+def mask_topics(mask: int) -> Tuple[str, ...]:
+    """Topic names present in a mask, in TOPIC_KEYWORDS order"""
+    return _TOPICS_BY_MASK[(mask & TOPIC_MASK) >> _TOPIC_SHIFT]
+
+
+# Bump whenever vocabularies or bit layout change so stale stored features are ignored
+FEATURES_VERSION = 1
+
+
+def extract_message_features(message: str) -> Dict[str, Any]:
+    """Precompute the keyword mask of a message for storage alongside the experience"""
+    message_lower = str(message).lower()
+    return {
+        "version": FEATURES_VERSION,
+        "mask": message_mask(message_lower)
+    }
@@ -2,12 +2,30 @@
 Proactive Intelligence Module for AI Life Operating System
 """
 
-from .proactive_intelligence import ProactiveIntelligenceEngine
-from .predictive_planner import PredictiveTaskPlanner
-from .autonomous_assistant import AutonomousAssistantManager
+import importlib
+
+# Public names and the submodule defining each; imported on first access (PEP 562)
+_LAZY_EXPORTS = {
+    'ProactiveIntelligenceEngine': '.proactive_intelligence',
+    'PredictiveTaskPlanner': '.predictive_planner',
+    'AutonomousAssistantManager': '.autonomous_assistant'
+}
 
 __all__ = [
     'ProactiveIntelligenceEngine',
     'PredictiveTaskPlanner', 
     'AutonomousAssistantManager'
 ]
+
+
+def __getattr__(name):
+    """Import the submodule defining ``name`` only when it is first used"""
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
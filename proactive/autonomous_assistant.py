@@ -7,24 +7,131 @@ import time
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import threading
+import random
+import queue
+import atexit
+import itertools
+from collections import deque
+
+# Finished interventions kept for status reporting; totals are tracked separately
+MAX_INTERVENTION_HISTORY = 500
+
+# Queued intervention records the background writer stores per wakeup
+WRITE_BATCH_SIZE = 16
+
+# Queued after the pending records to make the writer thread exit
+_STOP_WRITER = object()
+
+# Quick techniques offered by immediate stress relief interventions
+_RELIEF_TECHNIQUES = (
+    "Take 3 deep breaths: inhale for 4 counts, hold for 4, exhale for 6",
+    "Progressive muscle relaxation: tense and release your shoulders for 5 seconds",
+    "5-4-3-2-1 grounding: name 5 things you see, 4 you hear, 3 you feel, 2 you smell, 1 you taste",
+    "Quick walk or stretch break to reset your energy"
+)
 
 class AutonomousAssistantManager:
     """Manages autonomous AI operations and proactive assistance"""
     
+    __slots__ = (
+        'agent_network', '_has_orchestrator', 'memory_manager', 'autonomous_mode',
+        'active_interventions', 'intervention_history',
+        '_last_completed_at', '_success_count', '_total_count', '_state_lock',
+        '_intervention_ids',
+        '_write_queue', '_writer_thread', '_writer_lock',
+        'intervention_cooldown', 'max_concurrent_interventions',
+        'autonomous_confidence_threshold', '_handlers'
+    )
+    
+    # Agent prompts for proactive interventions, built once
+    _STRESS_TEMPLATE = """
+PROACTIVE STRESS MANAGEMENT INTERVENTION:
+Based on pattern analysis, the user may benefit from stress management support.
+
+Reasoning: {reasoning}
+Confidence: {confidence:.1%}
+
+Please provide:
+1. Brief stress assessment
+2. Immediate stress relief technique
+3. Long-term stress management suggestion
+4. Gentle check-in question
+
+Keep response supportive and non-intrusive.
+"""
+    
+    _PRODUCTIVITY_TEMPLATE = """
+PROACTIVE PRODUCTIVITY OPTIMIZATION:
+Pattern analysis suggests the user could benefit from productivity assistance.
+
+Reasoning: {reasoning}
+
+Please provide:
+1. Time management tip relevant to current time
+2. Task prioritization suggestion
+3. Quick productivity boost technique
+4. Optional check-in about current workload
+
+Keep response helpful but optional for user to engage with.
+"""
+    
+    _LEARNING_MESSAGE = """
+PROACTIVE LEARNING SUPPORT:
+User shows high question frequency, suggesting active learning mode.
+
+Please provide:
+1. Learning optimization tip
+2. Study technique recommendation  
+3. Knowledge retention strategy
+4. Offer to help with any current learning goals
+
+Make response encouraging and supportive of their learning journey.
+"""
+    
     def __init__(self, agent_network=None, memory_manager=None):
-        self.agent_network = agent_network
+        self.set_agent_network(agent_network)
         self.memory_manager = memory_manager
         self.autonomous_mode = False
-        self.active_interventions = []
-        self.intervention_history = []
+        self.active_interventions = {}  # intervention id -> intervention
+        self.intervention_history = deque(maxlen=MAX_INTERVENTION_HISTORY)
+        
+        # Running totals so cooldown and success checks don't rescan the history
+        self._last_completed_at = 0.0
+        self._success_count = 0
+        self._total_count = 0
+        
+        # Guards active/history bookkeeping; interventions may come from event threads
+        self._state_lock = threading.Lock()
+        
+        # Sequence that keeps ids unique for interventions admitted in the same second
+        self._intervention_ids = itertools.count(1)
+        
+        # Intervention records are stored by a background writer off the hot path;
+        # it is the queue's only consumer, so records are stored in order
+        self._write_queue = queue.SimpleQueue()
+        self._writer_thread = None
+        self._writer_lock = threading.Lock()
         
         # Autonomous operation parameters
         self.intervention_cooldown = 300  # 5 minutes between interventions
         self.max_concurrent_interventions = 3
         self.autonomous_confidence_threshold = 0.8
         
+        # Intervention category -> bound handler; anything else gets general assistance
+        self._handlers = {
+            'stress_management_support': self._provide_stress_management,
+            'productivity_optimization': self._provide_productivity_assistance,
+            'immediate_stress_relief': self._provide_immediate_stress_relief,
+            'learning_support': self._provide_learning_support
+        }
+        
         print("🤖 Autonomous Assistant Manager initialized")
     
+    def set_agent_network(self, agent_network):
+        """Attach the agent network used to route interventions"""
+        self.agent_network = agent_network
+        self._has_orchestrator = bool(agent_network) and hasattr(agent_network, 'orchestrator')
+    
     def enable_autonomous_mode(self):
         """Enable autonomous proactive assistance"""
         self.autonomous_mode = True
@@ -33,6 +140,7 @@ class AutonomousAssistantManager:
     def disable_autonomous_mode(self):
         """Disable autonomous mode"""
         self.autonomous_mode = False
+        self.flush_pending_writes()
         print("⏸️ Autonomous mode DISABLED")
     
     def execute_proactive_intervention(self, intervention: Dict[str, Any], user_id: str = "user") -> Dict[str, Any]:
@@ -40,19 +148,22 @@ class AutonomousAssistantManager:
         if not self.autonomous_mode:
             return {"status": "skipped", "reason": "Autonomous mode disabled"}
         
-        if len(self.active_interventions) >= self.max_concurrent_interventions:
-            return {"status": "deferred", "reason": "Too many active interventions"}
-        
-        # Check cooldown period
-        if self._is_in_cooldown():
-            return {"status": "deferred", "reason": "Intervention cooldown active"}
-        
-        intervention_id = f"intervention_{int(time.time())}"
-        intervention["id"] = intervention_id
-        intervention["started_at"] = time.time()
-        intervention["status"] = "executing"
-        
-        self.active_interventions.append(intervention)
+        # Admission checks and registration happen atomically; the intervention
+        # itself runs outside the lock
+        with self._state_lock:
+            if len(self.active_interventions) >= self.max_concurrent_interventions:
+                return {"status": "deferred", "reason": "Too many active interventions"}
+            
+            # Check cooldown period
+            if self._is_in_cooldown():
+                return {"status": "deferred", "reason": "Intervention cooldown active"}
+            
+            intervention_id = f"intervention_{int(time.time())}_{next(self._intervention_ids)}"
+            intervention["id"] = intervention_id
+            intervention["started_at"] = time.time()
+            intervention["status"] = "executing"
+            
+            self.active_interventions[intervention_id] = intervention
         
         try:
             # Execute the intervention based on type
@@ -61,10 +172,7 @@ class AutonomousAssistantManager:
             intervention["status"] = "completed"
             intervention["completed_at"] = time.time()
             intervention["result"] = result
-            
-            # Move to history
-            self.intervention_history.append(intervention)
-            self.active_interventions = [i for i in self.active_interventions if i["id"] != intervention_id]
+            self._finish_intervention(intervention)
             
             print(f"✅ Proactive intervention completed: {intervention.get('category', 'unknown')}")
             return {"status": "completed", "result": result, "intervention_id": intervention_id}
@@ -73,64 +181,40 @@ class AutonomousAssistantManager:
             intervention["status"] = "failed"
             intervention["error"] = str(e)
             intervention["completed_at"] = time.time()
-            
-            self.intervention_history.append(intervention)
-            self.active_interventions = [i for i in self.active_interventions if i["id"] != intervention_id]
+            self._finish_intervention(intervention)
             
             print(f"❌ Proactive intervention failed: {e}")
             return {"status": "failed", "error": str(e)}
     
     def _execute_intervention_by_type(self, intervention: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Execute intervention based on its type"""
-        category = intervention.get('category', 'general')
-        
-        if category == 'stress_management_support':
-            return self._provide_stress_management(intervention, user_id)
-        elif category == 'productivity_optimization':
-            return self._provide_productivity_assistance(intervention, user_id)
-        elif category == 'immediate_stress_relief':
-            return self._provide_immediate_stress_relief(intervention, user_id)
-        elif category == 'learning_support':
-            return self._provide_learning_support(intervention, user_id)
-        else:
-            return self._provide_general_assistance(intervention, user_id)
+        handler = self._handlers.get(intervention.get('category'), self._provide_general_assistance)
+        return handler(intervention, user_id)
     
     def _provide_stress_management(self, intervention: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Provide proactive stress management assistance"""
-        if self.agent_network and hasattr(self.agent_network, 'orchestrator'):
+        if self._has_orchestrator:
             # Route to stress management agent
-            stress_message = f"""
-PROACTIVE STRESS MANAGEMENT INTERVENTION:
-Based on pattern analysis, the user may benefit from stress management support.
-
-Reasoning: {intervention.get('reasoning', 'Pattern-based prediction')}
-Confidence: {intervention.get('confidence', 0.5):.1%}
-
-Please provide:
-1. Brief stress assessment
-2. Immediate stress relief technique
-3. Long-term stress management suggestion
-4. Gentle check-in question
-
-Keep response supportive and non-intrusive.
-"""
+            stress_message = self._STRESS_TEMPLATE.format_map({
+                "reasoning": intervention.get('reasoning', 'Pattern-based prediction'),
+                "confidence": intervention.get('confidence', 0.5)
+            })
             
             try:
                 response = self.agent_network.orchestrator.route_message(stress_message, "stressmanagementagent")
                 
                 # Store the proactive intervention
-                if self.memory_manager:
-                    self.memory_manager.store_enhanced_experience(
-                        user_id,
-                        {
-                            "type": "proactive_intervention",
-                            "category": "stress_management", 
-                            "intervention_data": intervention,
-                            "response": response.get('response', '')
-                        },
-                        {"proactive_assistance": 1.0, "stress_support": 0.8},
-                        0.9
-                    )
+                self._queue_experience(
+                    user_id,
+                    {
+                        "type": "proactive_intervention",
+                        "category": "stress_management", 
+                        "intervention_data": intervention,
+                        "response": response.get('response', '')
+                    },
+                    {"proactive_assistance": 1.0, "stress_support": 0.8},
+                    0.9
+                )
                 
                 return {
                     "type": "stress_management",
@@ -146,37 +230,25 @@ Keep response supportive and non-intrusive.
     
     def _provide_productivity_assistance(self, intervention: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Provide proactive productivity assistance"""
-        if self.agent_network and hasattr(self.agent_network, 'orchestrator'):
-            productivity_message = f"""
-PROACTIVE PRODUCTIVITY OPTIMIZATION:
-Pattern analysis suggests the user could benefit from productivity assistance.
-
-Reasoning: {intervention.get('reasoning', 'Temporal pattern analysis')}
-
-Please provide:
-1. Time management tip relevant to current time
-2. Task prioritization suggestion
-3. Quick productivity boost technique
-4. Optional check-in about current workload
-
-Keep response helpful but optional for user to engage with.
-"""
+        if self._has_orchestrator:
+            productivity_message = self._PRODUCTIVITY_TEMPLATE.format_map({
+                "reasoning": intervention.get('reasoning', 'Temporal pattern analysis')
+            })
             
             try:
                 response = self.agent_network.orchestrator.route_message(productivity_message, "productivityagent")
                 
-                if self.memory_manager:
-                    self.memory_manager.store_enhanced_experience(
-                        user_id,
-                        {
-                            "type": "proactive_intervention",
-                            "category": "productivity_optimization",
-                            "intervention_data": intervention,
-                            "response": response.get('response', '')
-                        },
-                        {"proactive_assistance": 1.0, "productivity_support": 0.8},
-                        0.8
-                    )
+                self._queue_experience(
+                    user_id,
+                    {
+                        "type": "proactive_intervention",
+                        "category": "productivity_optimization",
+                        "intervention_data": intervention,
+                        "response": response.get('response', '')
+                    },
+                    {"proactive_assistance": 1.0, "productivity_support": 0.8},
+                    0.8
+                )
                 
                 return {
                     "type": "productivity_optimization", 
@@ -192,27 +264,19 @@ Keep response helpful but optional for user to engage with.
     
     def _provide_immediate_stress_relief(self, intervention: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Provide immediate stress relief intervention"""
-        relief_techniques = [
-            "Take 3 deep breaths: inhale for 4 counts, hold for 4, exhale for 6",
-            "Progressive muscle relaxation: tense and release your shoulders for 5 seconds",
-            "5-4-3-2-1 grounding: name 5 things you see, 4 you hear, 3 you feel, 2 you smell, 1 you taste",
-            "Quick walk or stretch break to reset your energy"
-        ]
-        
-        selected_technique = relief_techniques[int(time.time()) % len(relief_techniques)]
+        selected_technique = random.choice(_RELIEF_TECHNIQUES)
         
-        if self.memory_manager:
-            self.memory_manager.store_enhanced_experience(
-                user_id,
-                {
-                    "type": "proactive_intervention",
-                    "category": "immediate_stress_relief",
-                    "technique_provided": selected_technique,
-                    "intervention_data": intervention
-                },
-                {"immediate_support": 1.0, "stress_relief": 0.9},
-                0.85
-            )
+        self._queue_experience(
+            user_id,
+            {
+                "type": "proactive_intervention",
+                "category": "immediate_stress_relief",
+                "technique_provided": selected_technique,
+                "intervention_data": intervention
+            },
+            {"immediate_support": 1.0, "stress_relief": 0.9},
+            0.85
+        )
         
         return {
             "type": "immediate_stress_relief",
@@ -223,35 +287,23 @@ Keep response helpful but optional for user to engage with.
     
     def _provide_learning_support(self, intervention: Dict[str, Any], user_id: str) -> Dict[str, Any]:
         """Provide proactive learning support"""
-        if self.agent_network and hasattr(self.agent_network, 'orchestrator'):
-            learning_message = f"""
-PROACTIVE LEARNING SUPPORT:
-User shows high question frequency, suggesting active learning mode.
-
-Please provide:
-1. Learning optimization tip
-2. Study technique recommendation  
-3. Knowledge retention strategy
-4. Offer to help with any current learning goals
-
-Make response encouraging and supportive of their learning journey.
-"""
+        if self._has_orchestrator:
+            learning_message = self._LEARNING_MESSAGE
             
             try:
                 response = self.agent_network.orchestrator.route_message(learning_message, "contextagent")
                 
-                if self.memory_manager:
-                    self.memory_manager.store_enhanced_experience(
-                        user_id,
-                        {
-                            "type": "proactive_intervention",
-                            "category": "learning_support",
-                            "intervention_data": intervention,
-                            "response": response.get('response', '')
-                        },
-                        {"proactive_assistance": 1.0, "learning_support": 0.7},
-                        0.75
-                    )
+                self._queue_experience(
+                    user_id,
+                    {
+                        "type": "proactive_intervention",
+                        "category": "learning_support",
+                        "intervention_data": intervention,
+                        "response": response.get('response', '')
+                    },
+                    {"proactive_assistance": 1.0, "learning_support": 0.7},
+                    0.75
+                )
                 
                 return {
                     "type": "learning_support",
@@ -273,22 +325,101 @@ Make response encouraging and supportive of their learning journey.
             "success": True
         }
     
+    def _queue_experience(self, user_id: str, experience: Dict[str, Any],
+                          emotional_weights: Dict[str, float], importance: float):
+        """Queue an intervention record for the background writer"""
+        if not self.memory_manager:
+            return
+
+        # Snapshot the intervention now; it is still updated after this call
+        if "intervention_data" in experience:
+            experience["intervention_data"] = dict(experience["intervention_data"])
+
+        self._write_queue.put((user_id, experience, emotional_weights, importance))
+        self._start_writer()
+
+    def _start_writer(self):
+        """Start the background writer thread if it isn't running"""
+        if self._writer_thread is not None:
+            return
+
+        with self._writer_lock:
+            if self._writer_thread is None:
+                self._writer_thread = threading.Thread(target=self._writer_loop)
+                self._writer_thread.daemon = True
+                self._writer_thread.start()
+                # Records still queued at exit are stored before the process ends
+                atexit.register(self.flush_pending_writes)
+
+    def _writer_loop(self):
+        """Store queued intervention records in small batches until told to stop"""
+        while True:
+            batch = [self._write_queue.get()]
+            try:
+                while len(batch) < WRITE_BATCH_SIZE and batch[-1] is not _STOP_WRITER:
+                    batch.append(self._write_queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            for item in batch:
+                if item is _STOP_WRITER:
+                    return
+                self._store_experience(item)
+
+    def _store_experience(self, item):
+        """Write one queued intervention record to memory"""
+        try:
+            self.memory_manager.store_enhanced_experience(*item)
+        except Exception as e:
+            print(f"⚠️ Intervention storage failed: {e}")
+
+    def flush_pending_writes(self):
+        """Store every queued intervention record and stop the writer thread.
+
+        A later record starts a new writer.
+        """
+        with self._writer_lock:
+            writer = self._writer_thread
+            if writer is None:
+                return
+
+            self._write_queue.put(_STOP_WRITER)
+            writer.join()
+            self._writer_thread = None
+            atexit.unregister(self.flush_pending_writes)
+            # Records queued while the writer was stopping are past the sentinel
+            restart = not self._write_queue.empty()
+
+        if restart:
+            self._start_writer()
+
+    def _finish_intervention(self, intervention: Dict[str, Any]):
+        """Move a finished intervention to history and update the running totals"""
+        with self._state_lock:
+            self.intervention_history.append(intervention)
+            self.active_interventions.pop(intervention["id"], None)
+            self._record_completion(intervention)
+    
+    def _record_completion(self, intervention: Dict[str, Any]):
+        """Update the running cooldown and success totals for a finished intervention"""
+        self._last_completed_at = max(self._last_completed_at, intervention["completed_at"])
+        self._total_count += 1
+        if intervention["status"] == "completed":
+            self._success_count += 1
+    
     def _is_in_cooldown(self) -> bool:
         """Check if we're in cooldown period"""
-        if not self.intervention_history:
+        if not self._total_count:
             return False
         
-        last_intervention = max(self.intervention_history, key=lambda x: x.get('completed_at', 0))
-        time_since_last = time.time() - last_intervention.get('completed_at', 0)
-        
-        return time_since_last < self.intervention_cooldown
+        return time.time() - self._last_completed_at < self.intervention_cooldown
     
     def get_intervention_status(self) -> Dict[str, Any]:
         """Get status of autonomous interventions"""
         return {
             "autonomous_mode": self.autonomous_mode,
             "active_interventions": len(self.active_interventions),
-            "total_interventions": len(self.intervention_history),
+            "total_interventions": self._total_count,
             "last_intervention": self.intervention_history[-1] if self.intervention_history else None,
             "success_rate": self._calculate_success_rate(),
             "cooldown_active": self._is_in_cooldown()
@@ -296,11 +427,10 @@ Make response encouraging and supportive of their learning journey.
     
     def _calculate_success_rate(self) -> float:
         """Calculate intervention success rate"""
-        if not self.intervention_history:
+        if not self._total_count:
             return 1.0
         
-        successful = sum(1 for i in self.intervention_history if i.get('status') == 'completed')
-        return successful / len(self.intervention_history)
+        return self._success_count / self._total_count
 
 # Test autonomous assistant
 if __name__ == "__main__":
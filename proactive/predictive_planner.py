@@ -5,28 +5,161 @@ Advanced prediction algorithms and autonomous task planning
 
 import time
 import json
-from typing import Dict, Any, List, Optional, Tuple
+import copy
+import threading
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from heapq import nlargest
+from operator import itemgetter
 import math
+import re
+
+# Keyword checks (plain substring semantics) compiled into single scans
+_STRESS_RE = re.compile('stress|overwhelmed|pressure')
+_HELP_RE = re.compile('help|assist|support|stuck')
+_PRODUCTIVITY_RE = re.compile('task|organize|deadline')
+
+# Scheduling rank of each task priority
+_PRIORITY_RANK = {"urgent": 3, "high": 2, "medium": 1, "low": 0}
+
+# Entries kept in each prediction cache; the least recently used is evicted first
+_PREDICTION_CACHE_SIZE = 256
+
+
+def _schedule_key(task: Dict[str, Any]) -> Tuple[int, float]:
+    """Sort key for scheduling: priority rank, then confidence"""
+    return _PRIORITY_RANK.get(task.get('priority', 'low'), 0), task.get('confidence', 0)
+
+# Stress trigger vocabularies, in reporting order
+_TRIGGER_KEYWORDS = {
+    'work': ('work', 'job', 'boss', 'project', 'deadline', 'meeting'),
+    'time': ('time', 'deadline', 'late', 'behind', 'schedule'),
+    'social': ('relationship', 'conflict', 'argument', 'social'),
+    'health': ('tired', 'sick', 'health', 'sleep'),
+    'financial': ('money', 'budget', 'financial', 'expensive')
+}
+_TRIGGER_BITS = tuple((1 << index, trigger_type) for index, trigger_type in enumerate(_TRIGGER_KEYWORDS))
+
+
+def _build_trigger_keyword_bits() -> Dict[str, int]:
+    """Map each keyword to its trigger bits, plus those of any keyword it contains.
+
+    The scan reports only the longest keyword at each position, so a keyword
+    also carries the bits of shorter keywords hidden inside it.
+    """
+    own_bits = defaultdict(int)
+    for bit, trigger_type in _TRIGGER_BITS:
+        for keyword in _TRIGGER_KEYWORDS[trigger_type]:
+            own_bits[keyword] |= bit
+    
+    keyword_bits = {}
+    for keyword in own_bits:
+        bits = 0
+        for other, other_bits in own_bits.items():
+            if other in keyword:
+                bits |= other_bits
+        keyword_bits[keyword] = bits
+    return keyword_bits
+
+
+_TRIGGER_KEYWORD_BITS = _build_trigger_keyword_bits()
+
+# One scan reports the longest keyword at every position (overlaps included)
+_TRIGGER_RE = re.compile('(?=(' + '|'.join(
+    re.escape(keyword) for keyword in sorted(_TRIGGER_KEYWORD_BITS, key=len, reverse=True)) + '))')
+
+
+@lru_cache(maxsize=4096)
+def _timestamp_hour(timestamp: str) -> Optional[int]:
+    """Hour of an ISO-8601 timestamp, or None if it cannot be parsed.
+
+    Cached because successive plans re-read mostly the same experiences.
+    """
+    try:
+        return datetime.fromisoformat(timestamp[:-1] + '+00:00' if timestamp.endswith('Z') else timestamp).hour
+    except (ValueError, TypeError, AttributeError):
+        return None
 
 class PredictiveTaskPlanner:
     """Advanced predictive planning for proactive assistance"""
     
+    __slots__ = (
+        'memory_manager', 'prediction_models', 'confidence_threshold',
+        'planning_horizon_hours', '_pattern_cache', '_temporal_cache',
+        '_cache_generation', '_cache_lock', 'prediction_cache_ttl'
+    )
+    
     def __init__(self, memory_manager=None):
         self.memory_manager = memory_manager
         self.prediction_models = {}
         self.confidence_threshold = 0.7
         self.planning_horizon_hours = 24
         
+        # Recent per-user results: user_id -> (computed_at, patterns) and
+        # (user_id, hour) -> (computed_at, predictions)
+        self._pattern_cache = OrderedDict()
+        self._temporal_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.prediction_cache_ttl = 60  # seconds
+        
+        # Bumped on every clear so results computed from older experiences
+        # are not cached; storing an experience clears that user's entries
+        self._cache_generation = 0
+        if hasattr(memory_manager, 'add_invalidation_listener'):
+            memory_manager.add_invalidation_listener(self.clear_prediction_cache)
+        
         print("🔮 Predictive Task Planner initialized")
     
+    def clear_prediction_cache(self, user_id: Optional[str] = None):
+        """Drop cached patterns and temporal predictions for one user, or for everyone"""
+        with self._cache_lock:
+            self._cache_generation += 1
+            if user_id is None:
+                self._pattern_cache.clear()
+                self._temporal_cache.clear()
+                return
+            self._pattern_cache.pop(user_id, None)
+            for key in [key for key in self._temporal_cache if key[0] == user_id]:
+                del self._temporal_cache[key]
+    
+    def _get_cached(self, cache: OrderedDict, key):
+        """Return a copy of a fresh cache entry, or None"""
+        with self._cache_lock:
+            entry = cache.get(key)
+            if entry is None or time.time() - entry[0] >= self.prediction_cache_ttl:
+                return None
+            cache.move_to_end(key)
+        return copy.deepcopy(entry[1])
+    
+    def _put_cached(self, cache: OrderedDict, key, value, generation: int):
+        """Cache a copy of value unless the cache was cleared after generation"""
+        value = copy.deepcopy(value)
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return
+            cache[key] = (time.time(), value)
+            cache.move_to_end(key)
+            if len(cache) > _PREDICTION_CACHE_SIZE:
+                cache.popitem(last=False)
+    
     def generate_predictive_plan(self, user_id: str, current_context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Generate comprehensive predictive plan for user"""
         
-        # Get user patterns and current state
-        user_patterns = self._analyze_user_patterns(user_id)
-        temporal_predictions = self._predict_temporal_needs(user_id)
+        # Get user patterns and current state from at most one retrieval, made
+        # only when a cached result is missing (newest first, so the temporal
+        # window is its 50-experience prefix)
+        retrieved = []
+        
+        def load_experiences(limit: int) -> List[Dict]:
+            # Failures propagate to the calling analysis, which reports them
+            if not retrieved:
+                retrieved.append(self.memory_manager.retrieve_experiences(user_id, 100))
+            return retrieved[0][:limit]
+        
+        user_patterns = self._analyze_user_patterns(user_id, load_experiences)
+        temporal_predictions = self._predict_temporal_needs(user_id, load_experiences)
         contextual_predictions = self._predict_contextual_needs(user_id, current_context or {})
         
         # Generate proactive tasks
@@ -46,10 +179,23 @@ class PredictiveTaskPlanner:
             "confidence_score": self._calculate_plan_confidence(scheduled_plan)
         }
     
-    def _analyze_user_patterns(self, user_id: str) -> Dict[str, Any]:
-        """Analyze user behavioral patterns for prediction"""
+    def _analyze_user_patterns(self, user_id: str,
+                               load_experiences: Optional[Callable[[int], List[Dict]]] = None) -> Dict[str, Any]:
+        """Analyze user behavioral patterns for prediction, reusing a fresh cached result.
+
+        On a cache miss the latest 100 experiences come from ``load_experiences``
+        (called with the limit) or, if not given, straight from memory.
+        """
+        generation = self._cache_generation
+        cached = self._get_cached(self._pattern_cache, user_id)
+        if cached is not None:
+            return cached
+        
         try:
-            experiences = self.memory_manager.retrieve_experiences(user_id, 100)
+            if load_experiences is None:
+                experiences = self.memory_manager.retrieve_experiences(user_id, 100)
+            else:
+                experiences = load_experiences(100)
             
             patterns = {
                 "peak_activity_times": [],
@@ -75,14 +221,12 @@ class PredictiveTaskPlanner:
                 # Track activity times (if timestamp available)
                 timestamp = exp.get('timestamp', '')
                 if timestamp:
-                    try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        activity_hours.append(dt.hour)
-                    except:
-                        pass
+                    hour = _timestamp_hour(timestamp)
+                    if hour is not None:
+                        activity_hours.append(hour)
                 
                 # Track stress patterns
-                if 'stress' in emotional_context or any(word in message for word in ['stress', 'overwhelmed', 'pressure']):
+                if 'stress' in emotional_context or _STRESS_RE.search(message):
                     stress_episodes.append({
                         'triggers': self._extract_stress_triggers(message),
                         'intensity': emotional_context.get('stress', 0.7),
@@ -90,27 +234,28 @@ class PredictiveTaskPlanner:
                     })
                 
                 # Track help-seeking
-                if any(word in message for word in ['help', 'assist', 'support', 'stuck']):
+                if _HELP_RE.search(message):
                     help_requests += 1
             
             # Calculate patterns
             if activity_hours:
                 # Find peak activity hours
-                from collections import Counter
-                hour_counts = Counter(activity_hours)
-                peak_hours = [hour for hour, count in hour_counts.most_common(3)]
-                patterns["peak_activity_times"] = peak_hours
+                hour_counts = defaultdict(int)
+                for hour in activity_hours:
+                    hour_counts[hour] += 1
+                patterns["peak_activity_times"] = [hour for hour, count in nlargest(3, hour_counts.items(), key=itemgetter(1))]
             
             if stress_episodes:
                 # Find common stress triggers
-                all_triggers = []
+                trigger_counts = defaultdict(int)
                 for episode in stress_episodes:
-                    all_triggers.extend(episode['triggers'])
-                trigger_counts = Counter(all_triggers)
-                patterns["common_stress_triggers"] = [trigger for trigger, count in trigger_counts.most_common(3)]
+                    for trigger in episode['triggers']:
+                        trigger_counts[trigger] += 1
+                patterns["common_stress_triggers"] = [trigger for trigger, count in nlargest(3, trigger_counts.items(), key=itemgetter(1))]
             
             patterns["help_seeking_frequency"] = help_requests / max(1, total_messages)
             
+            self._put_cached(self._pattern_cache, user_id, patterns, generation)
             return patterns
             
         except Exception as e:
@@ -119,39 +264,39 @@ class PredictiveTaskPlanner:
     
     def _extract_stress_triggers(self, message: str) -> List[str]:
         """Extract stress triggers from message"""
-        triggers = []
-        trigger_keywords = {
-            'work': ['work', 'job', 'boss', 'project', 'deadline', 'meeting'],
-            'time': ['time', 'deadline', 'late', 'behind', 'schedule'],
-            'social': ['relationship', 'conflict', 'argument', 'social'],
-            'health': ['tired', 'sick', 'health', 'sleep'],
-            'financial': ['money', 'budget', 'financial', 'expensive']
-        }
+        trigger_bits = 0
+        for keyword in _TRIGGER_RE.findall(message):
+            trigger_bits |= _TRIGGER_KEYWORD_BITS[keyword]
         
-        for trigger_type, keywords in trigger_keywords.items():
-            if any(keyword in message for keyword in keywords):
-                triggers.append(trigger_type)
-        
-        return triggers
+        return [trigger_type for bit, trigger_type in _TRIGGER_BITS if trigger_bits & bit]
     
-    def _predict_temporal_needs(self, user_id: str) -> List[Dict[str, Any]]:
-        """Predict needs based on time patterns"""
+    def _predict_temporal_needs(self, user_id: str,
+                                load_experiences: Optional[Callable[[int], List[Dict]]] = None) -> List[Dict[str, Any]]:
+        """Predict needs based on time patterns from the latest 50 experiences (loaded only on a cache miss)"""
         predictions = []
         current_hour = datetime.now().hour
         
+        # Predictions only depend on the hour, so reuse them within it
+        cache_key = (user_id, current_hour)
+        generation = self._cache_generation
+        cached = self._get_cached(self._temporal_cache, cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            experiences = self.memory_manager.retrieve_experiences(user_id, 50)
+            if load_experiences is None:
+                experiences = self.memory_manager.retrieve_experiences(user_id, 50)
+            else:
+                experiences = load_experiences(50)
             
             # Analyze hourly patterns
             hourly_activities = defaultdict(list)
             for exp in experiences:
                 timestamp = exp.get('timestamp', '')
                 if timestamp:
-                    try:
-                        dt = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        hourly_activities[dt.hour].append(exp.get('experience', {}))
-                    except:
-                        continue
+                    hour = _timestamp_hour(timestamp)
+                    if hour is not None:
+                        hourly_activities[hour].append(exp.get('experience', {}))
             
             # Predict based on current hour
             if current_hour in hourly_activities:
@@ -171,8 +316,7 @@ class PredictiveTaskPlanner:
                 
                 # Check for productivity patterns
                 productivity_mentions = sum(1 for act in similar_activities
-                                          if any(word in str(act.get('message', '')).lower() 
-                                               for word in ['task', 'organize', 'deadline']))
+                                          if _PRODUCTIVITY_RE.search(str(act.get('message', '')).lower()))
                 
                 if productivity_mentions > 2:
                     predictions.append({
@@ -182,6 +326,7 @@ class PredictiveTaskPlanner:
                         "recommended_action": "Offer task organization assistance"
                     })
             
+            self._put_cached(self._temporal_cache, cache_key, predictions, generation)
             return predictions
             
         except Exception as e:
@@ -281,12 +426,7 @@ class PredictiveTaskPlanner:
     def _schedule_proactive_tasks(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Schedule proactive tasks based on priority and timing"""
         # Sort by priority and confidence
-        priority_order = {"urgent": 3, "high": 2, "medium": 1, "low": 0}
-        
-        scheduled_tasks = sorted(tasks, 
-                               key=lambda x: (priority_order.get(x.get('priority', 'low'), 0), 
-                                            x.get('confidence', 0)), 
-                               reverse=True)
+        scheduled_tasks = sorted(tasks, key=_schedule_key, reverse=True)
         
         # Add scheduling information
         current_time = time.time()
@@ -305,11 +445,17 @@ class PredictiveTaskPlanner:
         if not scheduled_tasks:
             return 0.0
         
-        total_confidence = sum(task.get('confidence', 0) for task in scheduled_tasks)
+        # One pass for both the total and the high-confidence count
+        total_confidence = 0
+        high_conf_tasks = 0
+        for task in scheduled_tasks:
+            confidence = task.get('confidence', 0)
+            total_confidence += confidence
+            if confidence > 0.8:
+                high_conf_tasks += 1
         avg_confidence = total_confidence / len(scheduled_tasks)
         
         # Weight by number of high-confidence tasks
-        high_conf_tasks = sum(1 for task in scheduled_tasks if task.get('confidence', 0) > 0.8)
         confidence_boost = min(0.2, (high_conf_tasks / len(scheduled_tasks)) * 0.2)
         
         return min(1.0, avg_confidence + confidence_boost)
@@ -4,56 +4,171 @@ Provides advanced prediction, autonomous planning, and anticipatory capabilities
 """
 
 
+import copy
+import logging
+import math
+import threading
 import time
+from collections import deque
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from memory.pattern_recognition import PatternRecognitionEngine
 from memory.memory_consolidation import MemoryConsolidationEngine
 
 
+logger = logging.getLogger(__name__)
+
+# Predictions kept for status reporting; the total count is tracked separately
+MAX_PREDICTION_HISTORY = 1000
+
+# Users whose latest analysis is kept for reuse; the oldest entry is evicted first
+MAX_CACHED_ANALYSES = 128
+
+# Needs that are always urgent, whatever the confidence
+_HIGH_PRIORITY_NEEDS = frozenset({"stress_management_support", "immediate_stress_relief", "urgent_assistance"})
+
+# Task priorities counted as high priority in planning and status reports
+_HIGH_PRIORITIES = frozenset({"urgent", "high"})
+
+# Sort score of each task priority
+_PRIORITY_SCORES = {"urgent": 4, "high": 3, "medium": 2, "low": 1}
+
+# Needs executed within 5 minutes, and high-impact needs executed within 10-30 minutes
+_IMMEDIATE_NEEDS = frozenset({"immediate_stress_relief", "urgent_assistance"})
+_HIGH_IMPACT_NEEDS = frozenset({"stress_management_support", "productivity_optimization"})
+
+# Base impact of addressing each need, scaled by confidence
+_IMPACT_SCORES = {
+    "stress_management_support": 0.9,
+    "immediate_stress_relief": 0.95,
+    "productivity_optimization": 0.8,
+    "learning_support": 0.7,
+    "assistance_with_work": 0.85
+}
+
+# Simulated outcome of executing a task of each category
+_EXECUTION_RESULTS = {
+    "stress_management_support": "Stress management resources prepared and delivered",
+    "productivity_optimization": "Productivity suggestions generated and queued",
+    "learning_support": "Learning optimization tips prepared",
+    "immediate_stress_relief": "Quick stress relief technique provided"
+}
+
+# Task description templates for known needs, filled in with the confidence
+_TASK_DESCRIPTIONS = {
+    "stress_management_support": "Provide stress management assistance (confidence: {:.1%})",
+    "assistance_with_work": "Offer work-related productivity support (confidence: {:.1%})",
+    "learning_support": "Provide learning optimization guidance (confidence: {:.1%})",
+    "productivity_optimization": "Suggest productivity improvements (confidence: {:.1%})",
+    "emotional_support": "Offer emotional wellness support (confidence: {:.1%})"
+}
+
+
+def _task_window(task: Dict[str, Any]) -> tuple:
+    """(start, end) of a task's execution window; a missing bound never excludes the task"""
+    execution_window = task.get("execution_window", {})
+    return execution_window.get("start", -math.inf), execution_window.get("end", math.inf)
+
+
+@lru_cache(maxsize=512)
+def _task_description(predicted_need: str, confidence: float) -> str:
+    """Human-readable task description; cached as plans repeat the same predictions"""
+    template = _TASK_DESCRIPTIONS.get(predicted_need)
+    if template is None:
+        return f"Provide proactive assistance with {predicted_need.replace('_', ' ')} (confidence: {confidence:.1%})"
+    return template.format(confidence)
+
+
 class ProactiveIntelligenceEngine:
     def __init__(self, memory_manager=None, pattern_engine=None, consolidation_engine=None):
         self.memory_manager = memory_manager
         self.pattern_engine = pattern_engine or PatternRecognitionEngine(memory_manager)
         self.consolidation_engine = consolidation_engine or MemoryConsolidationEngine(memory_manager)
-        self.proactive_tasks = []  # Queue of planned proactive actions
-        self.prediction_history = []
+        self.proactive_tasks = {}  # Queue of planned proactive actions: category -> task, in planning order
+        self._task_windows = {}  # category -> (start, end) of the queued task's execution window
+        self._high_priority_count = 0  # Queued tasks with urgent or high priority
+        self.prediction_history = deque(maxlen=MAX_PREDICTION_HISTORY)
+        self._prediction_count = 0
         self.intervention_threshold = 0.7
+        
+        # Recent per-user analysis: user_id -> (computed_at, (patterns, insights, predictions, confidence)).
+        # Storing an experience clears the user's entry (possibly from another
+        # thread); the generation moves on every clear so an analysis of older
+        # experiences is not cached after it
+        self._analysis_cache = {}
+        self._analysis_lock = threading.Lock()
+        self._analysis_generation = 0
+        self.analysis_cache_ttl = 30  # seconds
+        
+        experience_source = getattr(self.pattern_engine, 'memory_manager', None)
+        if hasattr(experience_source, 'add_invalidation_listener'):
+            experience_source.add_invalidation_listener(self.clear_analysis_cache)
         print("⚡ Proactive Intelligence Engine initialized")
 
 
+    def clear_analysis_cache(self, user_id: Optional[str] = None):
+        """Drop the cached analysis for one user, or for everyone"""
+        with self._analysis_lock:
+            self._analysis_generation += 1
+            if user_id is None:
+                self._analysis_cache.clear()
+            else:
+                self._analysis_cache.pop(user_id, None)
+
+
     def analyze_and_predict(self, user_id: str) -> Dict[str, Any]:
         """Analyze patterns and predict user needs proactively"""
         try:
-            # Get comprehensive analysis
-            pattern_data = self.pattern_engine.analyze_all_patterns(user_id)
-            consolidated_data = self.consolidation_engine.get_consolidated_insights(user_id)
-            predictions = self.pattern_engine.predict_user_needs(user_id)
+            now = time.time()
+            with self._analysis_lock:
+                cached = self._analysis_cache.get(user_id)
+                generation = self._analysis_generation
+            if cached and now - cached[0] < self.analysis_cache_ttl:
+                # Reuse (a copy of) the recent analysis; it was already recorded in the history
+                pattern_data, consolidated_data, predictions, overall_confidence = copy.deepcopy(cached[1])
+            else:
+                # Get comprehensive analysis from a single experience retrieval
+                experiences = self.pattern_engine.memory_manager.retrieve_experiences(user_id, 200)
+                pattern_data = self.pattern_engine.analyze_all_patterns(user_id, experiences=experiences)
+                consolidated_data = self.consolidation_engine.get_consolidated_insights(user_id)
+                predictions = self.pattern_engine.predict_user_needs(user_id, experiences)
+                overall_confidence = self._calculate_overall_confidence(predictions)
+                
+                # Store prediction for learning
+                self.prediction_history.append({
+                    "timestamp": now,
+                    "predictions": predictions,
+                    "confidence": overall_confidence
+                })
+                self._prediction_count += 1
+                
+                # Cache a private copy; the caller may modify what it is returned
+                analysis = copy.deepcopy((pattern_data, consolidated_data, predictions, overall_confidence))
+                with self._analysis_lock:
+                    if generation == self._analysis_generation:
+                        self._analysis_cache.pop(user_id, None)
+                        if len(self._analysis_cache) >= MAX_CACHED_ANALYSES:
+                            self._analysis_cache.pop(next(iter(self._analysis_cache)))
+                        self._analysis_cache[user_id] = (now, analysis)
 
 
-            # Generate proactive plan
-            proactive_plan = self._generate_proactive_plan(pattern_data, predictions)
-            
-            # Store prediction for learning
-            self.prediction_history.append({
-                "timestamp": time.time(),
-                "predictions": predictions,
-                "confidence": self._calculate_overall_confidence(predictions)
-            })
+            # Plan tasks afresh each time; queued tasks are updated when executed
+            proactive_plan = self._generate_proactive_plan(pattern_data, predictions, now)
 
 
             return {
                 "user_id": user_id,
-                "timestamp": time.time(),
+                "timestamp": now,
                 "pattern_analysis": pattern_data,
                 "memory_consolidation": consolidated_data,
                 "predictions": predictions,
                 "proactive_plan": proactive_plan,
-                "overall_confidence": self._calculate_overall_confidence(predictions)
+                "overall_confidence": overall_confidence
             }
 
 
         except Exception as e:
-            print(f"⚠️ Proactive analysis failed: {e}")
+            logger.error("⚠️ Proactive analysis failed: %s", e)
             return {
                 "user_id": user_id,
                 "error": str(e),
@@ -62,22 +177,26 @@ class ProactiveIntelligenceEngine:
             }
 
 
-    def _generate_proactive_plan(self, pattern_data: Dict[str, Any], predictions: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _generate_proactive_plan(self, pattern_data: Dict[str, Any], predictions: Dict[str, Any],
+                                 current_time: Optional[float] = None) -> List[Dict[str, Any]]:
         """Fixed proactive plan generation with lower thresholds"""
         tasks = []
-        current_time = time.time()
+        if current_time is None:
+            current_time = time.time()
+        id_prefix = f"proactive_{int(current_time)}_"
+        prediction_list = predictions.get("predictions", [])
         
-        print(f"🔮 Generating plan from {len(predictions.get('predictions', []))} predictions...")
+        logger.debug("🔮 Generating plan from %d predictions...", len(prediction_list))
         
         # Process predictions with LOWER threshold (0.5 instead of 0.7)
-        for prediction in predictions.get("predictions", []):
+        for prediction in prediction_list:
             predicted_need = prediction.get("predicted_need", "general_assistance")
             confidence = prediction.get("confidence", 0.5)
             
             # LOWER threshold to allow more predictions through
             if confidence >= 0.5:  # Changed from 0.7 to 0.5
                 task = {
-                    "id": f"proactive_{int(current_time)}_{len(tasks)}",
+                    "id": f"{id_prefix}{len(tasks)}",
                     "type": "proactive_intervention",
                     "category": predicted_need,
                     "confidence": confidence,
@@ -88,9 +207,9 @@ class ProactiveIntelligenceEngine:
                     "timestamp": current_time
                 }
                 tasks.append(task)
-                print(f"✅ Added task: {predicted_need} (confidence: {confidence:.2f})")
+                logger.debug("✅ Added task: %s (confidence: %.2f)", predicted_need, confidence)
             else:
-                print(f"⚠️ Skipped low confidence prediction: {predicted_need} ({confidence:.2f})")
+                logger.debug("⚠️ Skipped low confidence prediction: %s (%.2f)", predicted_need, confidence)
         
         # Add pattern-based tasks even if no predictions
         if not tasks and pattern_data.get('confidence_score', 0) > 0.5:
@@ -105,17 +224,15 @@ class ProactiveIntelligenceEngine:
                 "reasoning": "Strong patterns detected, offering general support",
                 "timestamp": current_time
             })
-            print(f"✅ Added fallback pattern-based task")
+            logger.debug("✅ Added fallback pattern-based task")
         
-        print(f"🎯 Generated {len(tasks)} proactive tasks")
+        logger.debug("🎯 Generated %d proactive tasks", len(tasks))
         return tasks
 
 
     def _determine_priority(self, confidence: float, predicted_need: str) -> str:
         """Determine task priority based on confidence and need type"""
-        high_priority_needs = ["stress_management_support", "immediate_stress_relief", "urgent_assistance"]
-        
-        if confidence > 0.9 or predicted_need in high_priority_needs:
+        if confidence > 0.9 or predicted_need in _HIGH_PRIORITY_NEEDS:
             return "urgent"
         elif confidence > 0.8:
             return "high"
@@ -127,53 +244,33 @@ class ProactiveIntelligenceEngine:
 
     def _priority_score(self, priority: str) -> int:
         """Convert priority to numeric score for sorting"""
-        scores = {"urgent": 4, "high": 3, "medium": 2, "low": 1}
-        return scores.get(priority, 1)
+        return _PRIORITY_SCORES.get(priority, 1)
 
 
     def _generate_task_description(self, predicted_need: str, confidence: float) -> str:
         """Generate human-readable task description"""
-        descriptions = {
-            "stress_management_support": f"Provide stress management assistance (confidence: {confidence:.1%})",
-            "assistance_with_work": f"Offer work-related productivity support (confidence: {confidence:.1%})",
-            "learning_support": f"Provide learning optimization guidance (confidence: {confidence:.1%})",
-            "productivity_optimization": f"Suggest productivity improvements (confidence: {confidence:.1%})",
-            "emotional_support": f"Offer emotional wellness support (confidence: {confidence:.1%})"
-        }
-        
-        return descriptions.get(
-            predicted_need, 
-            f"Provide proactive assistance with {predicted_need.replace('_', ' ')} (confidence: {confidence:.1%})"
-        )
+        return _task_description(predicted_need, confidence)
 
 
     def _calculate_execution_window(self, predicted_need: str) -> Dict[str, float]:
         """Calculate optimal execution timing for task"""
+        now = time.time()
+        
         # Immediate needs
-        immediate_needs = ["immediate_stress_relief", "urgent_assistance"]
-        if predicted_need in immediate_needs:
-            return {"start": time.time(), "end": time.time() + 300}  # 5 minutes
+        if predicted_need in _IMMEDIATE_NEEDS:
+            return {"start": now, "end": now + 300}  # 5 minutes
         
         # High-impact needs
-        high_impact_needs = ["stress_management_support", "productivity_optimization"]
-        if predicted_need in high_impact_needs:
-            return {"start": time.time() + 600, "end": time.time() + 1800}  # 10-30 minutes
+        if predicted_need in _HIGH_IMPACT_NEEDS:
+            return {"start": now + 600, "end": now + 1800}  # 10-30 minutes
         
         # General needs
-        return {"start": time.time() + 1800, "end": time.time() + 3600}  # 30-60 minutes
+        return {"start": now + 1800, "end": now + 3600}  # 30-60 minutes
 
 
     def _estimate_task_impact(self, predicted_need: str, confidence: float) -> float:
         """Estimate potential positive impact of task"""
-        impact_scores = {
-            "stress_management_support": 0.9,
-            "immediate_stress_relief": 0.95,
-            "productivity_optimization": 0.8,
-            "learning_support": 0.7,
-            "assistance_with_work": 0.85
-        }
-        
-        base_impact = impact_scores.get(predicted_need, 0.6)
+        base_impact = _IMPACT_SCORES.get(predicted_need, 0.6)
         return min(1.0, base_impact * confidence)
 
 
@@ -217,12 +314,18 @@ class ProactiveIntelligenceEngine:
         if not prediction_list:
             return 0.0
         
-        confidences = [p.get("confidence", 0.5) for p in prediction_list]
-        avg_confidence = sum(confidences) / len(confidences)
+        # One pass for both the total and the high-confidence count
+        total_confidence = 0
+        high_conf_count = 0
+        for prediction in prediction_list:
+            confidence = prediction.get("confidence", 0.5)
+            total_confidence += confidence
+            if confidence > 0.8:
+                high_conf_count += 1
+        avg_confidence = total_confidence / len(prediction_list)
         
         # Boost confidence if multiple high-confidence predictions
-        high_conf_count = sum(1 for c in confidences if c > 0.8)
-        confidence_boost = min(0.2, (high_conf_count / len(confidences)) * 0.2)
+        confidence_boost = min(0.2, (high_conf_count / len(prediction_list)) * 0.2)
         
         return min(1.0, avg_confidence + confidence_boost)
 
@@ -232,14 +335,15 @@ class ProactiveIntelligenceEngine:
         executed_tasks = []
         current_time = time.time()
         
-        # Filter tasks ready for execution
-        ready_tasks = [
-            task for task in self.proactive_tasks 
-            if self._is_task_ready(task, current_time)
-        ]
+        # Take up to limit tasks ready for execution, in queue order
+        ready_tasks = []
+        for category, (start_time, end_time) in self._task_windows.items():
+            if len(ready_tasks) >= limit:
+                break
+            if start_time <= current_time <= end_time:
+                ready_tasks.append((category, self.proactive_tasks[category]))
         
-        # Execute up to limit number of tasks
-        for task in ready_tasks[:limit]:
+        for category, task in ready_tasks:
             try:
                 result = self._execute_single_task(task)
                 task["execution_result"] = result
@@ -247,45 +351,26 @@ class ProactiveIntelligenceEngine:
                 task["status"] = "completed"
                 
                 executed_tasks.append(task)
-                print(f"🛎️ Executed: {task['description']}")
+                logger.debug("🛎️ Executed: %s", task['description'])
                 
             except Exception as e:
                 task["execution_result"] = {"error": str(e)}
                 task["executed_at"] = current_time
                 task["status"] = "failed"
-                print(f"❌ Task execution failed: {e}")
-        
-        # Remove executed tasks from queue
-        self.proactive_tasks = [
-            task for task in self.proactive_tasks 
-            if task.get("status") not in ["completed", "failed"]
-        ]
+                logger.error("❌ Task execution failed: %s", e)
+            
+            # Remove executed task from queue
+            self._dequeue_task(category)
         
         return executed_tasks
 
 
-    def _is_task_ready(self, task: Dict[str, Any], current_time: float) -> bool:
-        """Check if task is ready for execution"""
-        execution_window = task.get("execution_window", {})
-        start_time = execution_window.get("start", current_time)
-        end_time = execution_window.get("end", current_time + 3600)
-        
-        return start_time <= current_time <= end_time
-
-
     def _execute_single_task(self, task: Dict[str, Any]) -> Dict[str, Any]:
         """Execute a single proactive task"""
         category = task.get("category", "general")
         
         # Simulate task execution (in real system, this would trigger agents)
-        execution_results = {
-            "stress_management_support": "Stress management resources prepared and delivered",
-            "productivity_optimization": "Productivity suggestions generated and queued",
-            "learning_support": "Learning optimization tips prepared",
-            "immediate_stress_relief": "Quick stress relief technique provided"
-        }
-        
-        result_message = execution_results.get(category, f"Proactive assistance for {category} prepared")
+        result_message = _EXECUTION_RESULTS.get(category, f"Proactive assistance for {category} prepared")
         
         return {
             "task_id": task.get("id"),
@@ -298,63 +383,78 @@ class ProactiveIntelligenceEngine:
 
     def plan_next_actions(self, user_id: str) -> Dict[str, Any]:
         """Main method: analyze, predict, and plan proactive actions"""
-        print(f"🔮 Planning proactive actions for {user_id}...")
+        logger.debug("🔮 Planning proactive actions for %s...", user_id)
         
         # Run comprehensive analysis
         analysis = self.analyze_and_predict(user_id)
         
-        # Add planned tasks to queue
-        new_tasks = analysis.get("proactive_plan", [])
-        self.proactive_tasks.extend(new_tasks)
+        # Remove outdated tasks, then queue new ones; a category already
+        # queued keeps its earlier task
+        current_time = time.time()
+        self._cleanup_task_queue(current_time)
         
-        # Remove duplicate or outdated tasks
-        self._cleanup_task_queue()
+        new_tasks = analysis.get("proactive_plan", [])
+        for task in new_tasks:
+            window = _task_window(task)
+            if window[1] > current_time:
+                self._enqueue_task(task, window)
         
         planning_summary = {
             "analysis": analysis,
             "new_tasks_planned": len(new_tasks),
             "total_queued_tasks": len(self.proactive_tasks),
-            "high_priority_tasks": len([t for t in self.proactive_tasks if t.get("priority") in ["urgent", "high"]]),
+            "high_priority_tasks": self._high_priority_count,
             "planning_confidence": analysis.get("overall_confidence", 0.0)
         }
         
-        print(f"✅ Planned {len(new_tasks)} new proactive tasks (confidence: {analysis.get('overall_confidence', 0):.1%})")
+        logger.debug("✅ Planned %d new proactive tasks (confidence: %.1f%%)", len(new_tasks), analysis.get('overall_confidence', 0) * 100)
         
         return planning_summary
 
 
-    def _cleanup_task_queue(self):
-        """Remove duplicate and outdated tasks"""
-        current_time = time.time()
-        
-        # Remove expired tasks
-        self.proactive_tasks = [
-            task for task in self.proactive_tasks
-            if task.get("execution_window", {}).get("end", current_time + 3600) > current_time
-        ]
+    def _enqueue_task(self, task: Dict[str, Any], window: tuple):
+        """Queue a task unless one for its category is already queued"""
+        category = task.get("category", "unknown")
+        if category in self.proactive_tasks:
+            return
         
-        # Remove duplicates based on category
-        seen_categories = set()
-        unique_tasks = []
-        
-        for task in self.proactive_tasks:
-            category = task.get("category", "unknown")
-            if category not in seen_categories:
-                unique_tasks.append(task)
-                seen_categories.add(category)
+        self.proactive_tasks[category] = task
+        self._task_windows[category] = window
+        if task.get("priority") in _HIGH_PRIORITIES:
+            self._high_priority_count += 1
+
+
+    def _dequeue_task(self, category: str):
+        """Remove the queued task for a category"""
+        task = self.proactive_tasks.pop(category, None)
+        self._task_windows.pop(category, None)
+        if task is not None and task.get("priority") in _HIGH_PRIORITIES:
+            self._high_priority_count -= 1
+
+
+    def _cleanup_task_queue(self, current_time: Optional[float] = None):
+        """Remove outdated tasks (duplicates are rejected when queued)"""
+        if current_time is None:
+            current_time = time.time()
         
-        self.proactive_tasks = unique_tasks
+        expired = [
+            category for category, (_, end_time) in self._task_windows.items()
+            if end_time <= current_time
+        ]
+        for category in expired:
+            self._dequeue_task(category)
 
 
     def get_proactive_status(self) -> Dict[str, Any]:
         """Get comprehensive status of proactive intelligence"""
+        current_time = time.time()
         return {
             "queued_tasks": len(self.proactive_tasks),
-            "prediction_history_count": len(self.prediction_history),
+            "prediction_history_count": self._prediction_count,
             "intervention_threshold": self.intervention_threshold,
             "recent_confidence": self.prediction_history[-1].get("confidence", 0.0) if self.prediction_history else 0.0,
-            "high_priority_tasks": len([t for t in self.proactive_tasks if t.get("priority") in ["urgent", "high"]]),
-            "ready_for_execution": len([t for t in self.proactive_tasks if self._is_task_ready(t, time.time())]),
+            "high_priority_tasks": self._high_priority_count,
+            "ready_for_execution": sum(1 for start_time, end_time in self._task_windows.values() if start_time <= current_time <= end_time),
             "system_health": "optimal" if len(self.proactive_tasks) > 0 else "ready"
         }
 
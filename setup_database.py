@@ -1,10 +1,123 @@
 import asyncio
+import json
+from itertools import groupby
 import asyncpg
-from sqlalchemy import create_engine, text
 import redis
 from config.settings import settings
 
 
+# Shared Redis connections; the pool connects lazily, so importing is free
+redis_pool = redis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=32,
+    socket_keepalive=True,
+    socket_timeout=5
+)
+
+# Core tables, sent as a single multi-statement script. Existing installs
+# predate the emotional_intensity column, hence the ALTER.
+_SCHEMA_DDL = """
+CREATE TABLE IF NOT EXISTS agent_states (
+    id SERIAL PRIMARY KEY,
+    agent_id VARCHAR(255) UNIQUE NOT NULL,
+    agent_name VARCHAR(255) NOT NULL,
+    current_state JSONB,
+    last_updated TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS memory_experiences (
+    id SERIAL PRIMARY KEY,
+    user_id VARCHAR(255),
+    experience_data JSONB,
+    emotional_context JSONB,
+    timestamp TIMESTAMP DEFAULT NOW(),
+    importance_score FLOAT DEFAULT 0.5,
+    emotional_intensity FLOAT DEFAULT 0.0
+);
+
+ALTER TABLE memory_experiences
+ADD COLUMN IF NOT EXISTS emotional_intensity FLOAT DEFAULT 0.0;
+
+CREATE TABLE IF NOT EXISTS event_log (
+    id SERIAL PRIMARY KEY,
+    event_type VARCHAR(255),
+    event_data JSONB,
+    source_agent VARCHAR(255),
+    timestamp TIMESTAMP DEFAULT NOW()
+);
+"""
+
+# Interactions kept per relationship, as in memory.relationship_memory
+_MAX_INTERACTION_HISTORY = 50
+
+
+def _merge_relationship_rows(rows):
+    """Fold duplicate relationship rows, oldest first, into one row's values"""
+    history = []
+    emotions = {}
+    tags = []
+    for row in rows:
+        history.extend(json.loads(row['interaction_history'] or '[]'))
+        # Same running average RelationshipMemoryNetwork applies per interaction
+        for emotion, intensity in json.loads(row['emotional_associations'] or '{}').items():
+            previous = emotions.get(emotion)
+            emotions[emotion] = intensity if previous is None else (previous + intensity) * 0.5
+        tags.extend(tag for tag in json.loads(row['context_tags'] or '[]') if tag not in tags)
+    history.sort(key=lambda interaction: interaction.get('timestamp') or '')
+    
+    total = sum(row['total_interactions'] or 0 for row in rows)
+    positive = sum(row['positive_interactions'] or 0 for row in rows)
+    negative = sum(row['negative_interactions'] or 0 for row in rows)
+    familiarity = min(1.0, total / 20.0)
+    if positive + negative:
+        strength = familiarity * 0.6 + positive / (positive + negative) * 0.4
+    else:
+        strength = familiarity * 0.5
+    
+    return (
+        json.dumps(history[-_MAX_INTERACTION_HISTORY:]), json.dumps(emotions), json.dumps(tags),
+        total, positive, negative, familiarity, strength,
+        min((row['first_interaction'] for row in rows if row['first_interaction']), default=None),
+        max((row['last_interaction'] for row in rows if row['last_interaction']), default=None)
+    )
+
+
+async def _merge_duplicate_relationships(conn):
+    """Merge rows sharing (user_id, entity_name) into the newest one; returns rows removed"""
+    rows = await conn.fetch("""
+        SELECT id, user_id, entity_name, interaction_history, emotional_associations,
+               context_tags, total_interactions, positive_interactions,
+               negative_interactions, first_interaction, last_interaction
+        FROM relationship_entities
+        WHERE (user_id, entity_name) IN (
+            SELECT user_id, entity_name FROM relationship_entities
+            GROUP BY user_id, entity_name HAVING COUNT(*) > 1
+        )
+        ORDER BY user_id, entity_name, last_interaction NULLS FIRST, first_interaction NULLS FIRST
+    """)
+    
+    removed = 0
+    for (user_id, entity_name), group in groupby(rows, key=lambda row: (row['user_id'], row['entity_name'])):
+        group = list(group)
+        keeper = group[-1]
+        await conn.execute("""
+            UPDATE relationship_entities
+            SET interaction_history = $2::jsonb, emotional_associations = $3::jsonb,
+                context_tags = $4::jsonb, total_interactions = $5,
+                positive_interactions = $6, negative_interactions = $7,
+                familiarity = $8, relationship_strength = $9,
+                first_interaction = $10, last_interaction = $11
+            WHERE id = $1
+        """, keeper['id'], *_merge_relationship_rows(group))
+        await conn.execute(
+            "DELETE FROM relationship_entities WHERE id = ANY($1::uuid[])",
+            [row['id'] for row in group[:-1]]
+        )
+        removed += len(group) - 1
+        print(f"🔀 Merged {len(group)} relationship rows for ({user_id}, {entity_name})")
+    return removed
+
+
 async def setup_postgres():
     """Setup PostgreSQL database and tables"""
     
@@ -24,58 +137,48 @@ async def setup_postgres():
     finally:
         await conn.close()
     
-    # Now connect to our database and create tables
-    engine = create_engine(settings.POSTGRES_URL)
+    # Now connect to our database and create tables on the same driver;
+    # outside a transaction each statement commits on its own
+    conn = await asyncpg.connect(settings.POSTGRES_URL)
     
-    with engine.connect() as conn:
+    try:
         # Note: aiuser already exists in your Docker setup, so skip user creation
         # or handle the exception gracefully
         try:
-            conn.execute(text("GRANT ALL PRIVILEGES ON DATABASE ailifeos TO aiuser"))
+            await conn.execute("GRANT ALL PRIVILEGES ON DATABASE ailifeos TO aiuser")
             print("✅ Granted privileges to aiuser")
         except Exception as e:
             print(f"Privileges might already be set: {e}")
         
-        # Create basic tables
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS agent_states (
-                id SERIAL PRIMARY KEY,
-                agent_id VARCHAR(255) UNIQUE NOT NULL,
-                agent_name VARCHAR(255) NOT NULL,
-                current_state JSONB,
-                last_updated TIMESTAMP DEFAULT NOW()
-            )
-        """))
-        
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS memory_experiences (
-                id SERIAL PRIMARY KEY,
-                user_id VARCHAR(255),
-                experience_data JSONB,
-                emotional_context JSONB,
-                timestamp TIMESTAMP DEFAULT NOW(),
-                importance_score FLOAT DEFAULT 0.5
-            )
-        """))
-        
-        conn.execute(text("""
-            CREATE TABLE IF NOT EXISTS event_log (
-                id SERIAL PRIMARY KEY,
-                event_type VARCHAR(255),
-                event_data JSONB,
-                source_agent VARCHAR(255),
-                timestamp TIMESTAMP DEFAULT NOW()
-            )
-        """))
-        
-        conn.commit()
+        # Create basic tables in one round trip
+        await conn.execute(_SCHEMA_DDL)
         print("✅ Database tables created")
+        
+        # relationship_entities is created by RelationshipMemoryNetwork; tables
+        # from before the unique (user_id, entity_name) constraint need its index.
+        # Duplicates would block the index, so they are merged into one row per
+        # pair first; any failure here aborts setup since the ON CONFLICT insert
+        # of new entities needs the index
+        if await conn.fetchval("SELECT to_regclass('relationship_entities')"):
+            async with conn.transaction():
+                # Keep writers from adding new duplicates until the index exists
+                await conn.execute("LOCK TABLE relationship_entities IN SHARE ROW EXCLUSIVE MODE")
+                removed = await _merge_duplicate_relationships(conn)
+                if removed:
+                    print(f"🧹 Merged away {removed} duplicate relationship entities")
+                await conn.execute("""
+                    CREATE UNIQUE INDEX IF NOT EXISTS uq_relationship_user_entity
+                    ON relationship_entities (user_id, entity_name)
+                """)
+            print("✅ Relationship entity index ready")
+    finally:
+        await conn.close()
 
 
 def setup_redis():
     """Test Redis connection"""
     try:
-        r = redis.from_url(settings.REDIS_URL)
+        r = redis.Redis(connection_pool=redis_pool)
         r.ping()
         print("✅ Redis connection successful")
         return r
@@ -84,6 +187,10 @@ def setup_redis():
         return None
 
 
+async def main():
+    """Set up PostgreSQL while checking Redis on a worker thread"""
+    await asyncio.gather(setup_postgres(), asyncio.to_thread(setup_redis))
+
+
 if __name__ == "__main__":
-    asyncio.run(setup_postgres())
-    setup_redis()
+    asyncio.run(main())
@@ -1,6 +1,7 @@
 import sys
 import time
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from setup_database import setup_postgres, setup_redis
 from letta_manager import LettaManager
 from agents.orchestrator_agent import OrchestratorAgent
@@ -21,15 +22,12 @@ class SystemIntegrationTest:
             # Test Redis
             redis_client = setup_redis()
             if redis_client:
-                self.results["database"] = "✅ PASS"
-                return True
+                return "database", "✅ PASS"
             else:
-                self.results["database"] = "❌ FAIL"
-                return False
+                return "database", "❌ FAIL"
         except Exception as e:
             print(f"Database test failed: {e}")
-            self.results["database"] = "❌ FAIL"
-            return False
+            return "database", "❌ FAIL"
     
     def test_letta_manager(self):
         """Test Letta integration"""
@@ -47,15 +45,12 @@ class SystemIntegrationTest:
                 # Test message sending
                 response = letta.send_message(agent['id'], "Are you working properly?")
                 if response:
-                    self.results["letta"] = "✅ PASS"
-                    return True
+                    return "letta", "✅ PASS"
             
-            self.results["letta"] = "❌ FAIL"
-            return False
+            return "letta", "❌ FAIL"
         except Exception as e:
             print(f"Letta test failed: {e}")
-            self.results["letta"] = "❌ FAIL"
-            return False
+            return "letta", "❌ FAIL"
     
     def test_orchestrator_agent(self):
         """Test orchestrator agent"""
@@ -71,15 +66,12 @@ class SystemIntegrationTest:
                 timeouts = orchestrator.check_timeouts(0)  # Immediate timeout for testing
                 
                 if len(timeouts) > 0:
-                    self.results["orchestrator"] = "✅ PASS"
-                    return True
+                    return "orchestrator", "✅ PASS"
             
-            self.results["orchestrator"] = "❌ FAIL"
-            return False
+            return "orchestrator", "❌ FAIL"
         except Exception as e:
             print(f"Orchestrator test failed: {e}")
-            self.results["orchestrator"] = "❌ FAIL"
-            return False
+            return "orchestrator", "❌ FAIL"
     
     def test_event_system(self):
         """Test event management"""
@@ -95,15 +87,12 @@ class SystemIntegrationTest:
             )
             
             if success:
-                self.results["events"] = "✅ PASS"
-                return True
+                return "events", "✅ PASS"
             else:
-                self.results["events"] = "❌ FAIL"
-                return False
+                return "events", "❌ FAIL"
         except Exception as e:
             print(f"Event system test failed: {e}")
-            self.results["events"] = "❌ FAIL"
-            return False
+            return "events", "❌ FAIL"
     
     def test_memory_system(self):
         """Test memory management"""
@@ -119,34 +108,47 @@ class SystemIntegrationTest:
                 # Test retrieval
                 experiences = memory.retrieve_experiences("test_user", 1)
                 if len(experiences) > 0:
-                    self.results["memory"] = "✅ PASS"
-                    return True
+                    return "memory", "✅ PASS"
             
-            self.results["memory"] = "❌ FAIL"
-            return False
+            return "memory", "❌ FAIL"
         except Exception as e:
             print(f"Memory system test failed: {e}")
-            self.results["memory"] = "❌ FAIL"
-            return False
+            return "memory", "❌ FAIL"
+    
+    def _run_test(self, test):
+        """Run one test, returning its (component, result) or None if it raised"""
+        try:
+            return test()
+        except Exception as e:
+            print(f"Test failed with exception: {e}")
+            return None
+    
+    def _record(self, outcome):
+        """Store a test's (component, result) outcome"""
+        if outcome:
+            component, result = outcome
+            self.results[component] = result
     
     def run_all_tests(self):
         """Run complete system integration test"""
         print("🚀 Starting System Integration Test")
         print("="*50)
         
+        # The database test creates the schema the others rely on; the rest
+        # are independent and mostly wait on I/O, so they run concurrently.
+        # Tests return their outcome and only this thread records results.
+        self._record(self._run_test(self.test_database_setup))
+        
         tests = [
-            self.test_database_setup,
             self.test_letta_manager,
             self.test_orchestrator_agent,
             self.test_event_system,
             self.test_memory_system
         ]
         
-        for test in tests:
-            try:
-                test()
-            except Exception as e:
-                print(f"Test failed with exception: {e}")
+        with ThreadPoolExecutor(max_workers=len(tests)) as executor:
+            for outcome in executor.map(self._run_test, tests):
+                self._record(outcome)
         
         print("\n" + "="*50)
         print("📊 TEST RESULTS:")
@@ -1,6 +1,10 @@
 from ai_life_system import AILifeOperatingSystem
+import os
 import time
 
+# Set INTERACTIVE_REALISM to pause between scenario messages like a real user
+PAUSE_BETWEEN_MESSAGES = bool(os.getenv("INTERACTIVE_REALISM"))
+
 def test_scenario_suite():
     """Test real-world usage scenarios"""
     
@@ -77,11 +81,13 @@ def test_scenario_suite():
                     else:
                         print("❌ No proactive response generated")
             else:
+                started = time.perf_counter()
                 response = ai_system.chat(message)
-                print(f"🤖 AI: {response}")
+                print(f"🤖 AI ({time.perf_counter() - started:.2f}s): {response}")
             
             # Brief pause between messages for realism
-            time.sleep(0.5)
+            if PAUSE_BETWEEN_MESSAGES:
+                time.sleep(0.5)
         
         print(f"\n✅ Scenario {i} completed")
         